@@ -1,5 +1,7 @@
 import streamlit as st
 
+from result_cache import cache_stats
+
 st.set_page_config(
     page_title="Defense Dashboards",
     layout="wide",
@@ -23,3 +25,12 @@ st.title("Defense Dashboard")
 #     "Tip: Filters are independent across tabs, and reset automatically "
 #     "when switching between Picks and Isos."
 # )
+
+# shared query-result cache (all sessions in this server process)
+with st.expander("Result cache"):
+    stats = cache_stats()
+    st.caption(
+        f"{stats['hits']:,} hits / {stats['misses']:,} misses ({stats['hit_rate']:.0%}), "
+        f"{stats['entries']:,} entries, {stats['bytes'] / 2**20:.1f} of {stats['budget_bytes'] / 2**20:.0f} MB"
+    )
+    st.json(stats)
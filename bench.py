@@ -0,0 +1,325 @@
+"""
+Benchmarks for the dashboard data paths on synthetic season-scale data.
+
+    python bench.py                          # 1x, 10x, 100x -> JSON on stdout
+    python bench.py --scales 1 10 --out bench.json --repeat 5
+
+Synthetic files are built from the shipped test CSVs (same headers, dtypes
+and value mix; drive files from scr_defended_test.csv, closeouts from
+closeouts_defended_test.csv, picks derived from the drive rows): scale N
+replays the template N times as new games, so rows and games grow N-fold
+while teams / players stay a season's roster. They're generated once under
+--work-dir and reused. Only the headless functions (data_store, game_cube,
+queries) are timed. Output is one JSON document: run metadata plus one
+record per (scale, case) with median / min seconds over --repeat runs.
+"""
+import argparse
+import csv
+import json
+import platform
+import shutil
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import data_store
+import game_cube
+import queries
+from data_store import CACHE_DIR_NAME, MMAP_DIR_NAME, clear_datasets, load_mapped, load_table
+from game_cube import PLAY_TYPES, source_files
+from result_cache import clear_cache
+
+APP_DIR = Path(__file__).resolve().parent
+DRIVE_TEMPLATE = APP_DIR / "scr_defended_test.csv"
+CLOSEOUT_TEMPLATE = APP_DIR / "closeouts_defended_test.csv"
+
+SEASON_START = pd.Timestamp("2025-10-21")
+SEASON_DAYS = 170
+DATA_VERSION = 2  # bump when the generator changes; files from older versions aren't reused
+
+# page schemas, as passed by pages/1_* (picks) and pages/4_* (screen switch)
+PICK_PAGE = dict(defender_name_cols=["BallHandlerDefenderName"], player_key_col="DPlayerKey", outcome_col="pick_defense_outcome", deftype_col="scr_def_type")
+DRIVE_PAGE = dict(defender_name_cols=["firstName", "lastName"], player_key_col="PlayerKey", outcome_col="drive_label", deftype_col=None)
+MASTER_COLS = ("DTeamAbbrev", "GameKey")
+
+
+# ---- synthetic data ----
+
+def _read_template(path: Path) -> tuple[list[str], pd.DataFrame]:
+    # raw header too: the real files repeat OTeamAbbrev and lead with an unnamed index
+    with open(path, newline="") as fh:
+        header = next(csv.reader(fh))
+    return header, pd.read_csv(path)
+
+
+def _picks_template(drives: pd.DataFrame) -> pd.DataFrame:
+    # no picks sample ships with the repo: same games / defenders, pick columns the pages read
+    rng = np.random.default_rng(0)
+    name = drives["firstName"].str.strip() + " " + drives["lastName"].str.strip()
+    return pd.DataFrame({
+        "SeasonKey": drives["SeasonKey"],
+        "PickKey": drives["DriveKey"],
+        "GameKey": drives["GameKey"],
+        "chance_id": drives["chance_id"],
+        "DPlayerKey": drives["DPlayerKey"],
+        "BallHandlerDefenderName": name,
+        "scr_def_type": rng.choice(["switch", "drop", "hedge", "show", "blitz"], len(drives)),
+        "pick_defense_outcome": drives["drive_label"],
+        "OTeamAbbrev": drives["OTeamAbbrev"],
+        "DTeamAbbrev": drives["DTeamAbbrev"],
+        "game_date": drives["game_date"],
+        "firstName": drives["firstName"],
+        "lastName": drives["lastName"],
+    })
+
+
+def _replay(template: pd.DataFrame, scale: int, key_col: str, games: pd.Index) -> pd.DataFrame:
+    """
+    `scale` copies of template, each copy's games re-keyed as new games across
+    the season. `games` is every template's GameKeys, sorted, so a game gets
+    the same new key (and date) in every file.
+    """
+    game_code = games.get_indexer(template["GameKey"])
+    n_games = len(games)
+    has_date = template["game_date"].notna().to_numpy()
+    parts = []
+    for r in range(scale):
+        part = template.copy()
+        new_game = r * n_games + game_code
+        part["GameKey"] = 30_000_000_000 + new_game
+        part[key_col] = part[key_col] + r * 100_000_000_000
+        part["chance_id"] = part["chance_id"] + f"-{r}"
+        day = (new_game * SEASON_DAYS) // (n_games * scale)
+        dates = (SEASON_START + pd.to_timedelta(day, unit="D")).strftime("%Y-%m-%d")
+        part["game_date"] = np.where(has_date, dates, None)
+        parts.append(part)
+    out = pd.concat(parts, ignore_index=True)
+    if "Unnamed: 0" in out.columns:
+        out["Unnamed: 0"] = np.arange(len(out))
+    return out
+
+
+def generate(work_dir: Path, scale: int) -> Path:
+    """Write the four play files at `scale` into work_dir/v<DATA_VERSION>/<scale>x (kept if already there)."""
+    data_dir = work_dir / f"v{DATA_VERSION}" / f"{scale}x"
+    files = source_files(data_dir)
+    if all(p.exists() for p in files.values()):
+        return data_dir
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    drive_header, drives = _read_template(DRIVE_TEMPLATE)
+    closeout_header, closeouts = _read_template(CLOSEOUT_TEMPLATE)
+    picks = _picks_template(drives)
+    games = pd.Index(pd.concat([drives["GameKey"], closeouts["GameKey"]]).dropna().unique()).sort_values()
+    sources = {
+        "iso": (drive_header, drives, "DriveKey"),
+        "bhr_def": (None, picks, "PickKey"),
+        "scr_def": (drive_header, drives, "DriveKey"),
+        "closeout": (closeout_header, closeouts, "DriveKey"),
+    }
+    for suffix, (header, template, key_col) in sources.items():
+        df = _replay(template, scale, key_col, games)
+        tmp = files[suffix].with_suffix(".tmp")
+        df.to_csv(tmp, index=header is None, header=header or True)
+        tmp.replace(files[suffix])
+    return data_dir
+
+
+# ---- timing ----
+
+def _time(fn, repeat: int, setup=None) -> list[float]:
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def _drop_cache(data_dir: Path) -> None:
+    clear_datasets()
+    shutil.rmtree(data_dir / CACHE_DIR_NAME, ignore_errors=True)
+
+
+def _drop_mmap(data_dir: Path) -> None:
+    clear_datasets()
+    for p in (data_dir / CACHE_DIR_NAME).glob(f"*/{MMAP_DIR_NAME}"):
+        shutil.rmtree(p, ignore_errors=True)
+
+
+def _drop_cube(data_dir: Path) -> None:
+    for p in (data_dir / CACHE_DIR_NAME).glob("game_cube*"):
+        p.unlink()
+
+
+def _page_frame(path: str, schema: dict) -> pd.DataFrame:
+    cols = ["DTeamAbbrev", "GameKey", schema["player_key_col"],
+            schema["outcome_col"], "chance_id", schema["deftype_col"]]
+    return queries.load_page_data(path, [c for c in cols if c], "GameKey", "DTeamAbbrev")
+
+
+def _busiest_team_game(df: pd.DataFrame) -> tuple[str, str]:
+    # a realistic single-game selection: the most common team and its first game
+    team = str(df["DTeamAbbrev"].value_counts().index[0])
+    game = str(df.loc[df["DTeamAbbrev"] == team, "GameKey"].iloc[0])
+    return team, game
+
+
+def bench_scale(data_dir: Path, scale: int, repeat: int) -> list[dict]:
+    files = {s: str(p) for s, p in source_files(data_dir).items()}
+    picks, drives = files["bhr_def"], files["scr_def"]
+    records = []
+
+    def case(name: str, fn, rows: int, setup=None, n: int = repeat) -> None:
+        times = _time(fn, n, setup)
+        records.append({
+            "scale": scale,
+            "case": name,
+            "rows": int(rows),
+            "repeat": n,
+            "median_s": statistics.median(times),
+            "min_s": min(times),
+        })
+        print(f"  {scale:>4}x {name:<44} {statistics.median(times) * 1e3:10.2f} ms", file=sys.stderr)
+
+    rows = {s: len(load_table(p, columns=["GameKey"])) for s, p in files.items()}
+    all_rows = sum(rows.values())
+
+    # store: first parse of every CSV vs. reads from the columnar store
+    case("store_build_cold", lambda: [load_table(p, columns=["GameKey"]) for p in files.values()],
+         all_rows, setup=lambda: _drop_cache(data_dir), n=1)
+    case("load_table_all_columns", lambda: load_table(drives), rows["scr_def"])
+    # memory-mapped columns: the one-time export vs. mapping them (a new process)
+    case("mmap_export_cold", lambda: [load_mapped(p) for p in files.values()],
+         all_rows, setup=lambda: _drop_mmap(data_dir), n=1)
+    case("load_mapped_all_columns", lambda: load_mapped(drives), rows["scr_def"])
+
+    # player / game dimensions over all four files
+    case("player_dim_cold", lambda: queries.players(data_dir), all_rows,
+         setup=lambda: clear_cache() or clear_datasets(), n=1)
+    case("game_dim_cold", lambda: queries.games(data_dir), all_rows,
+         setup=lambda: clear_cache() or clear_datasets(), n=1)
+    dim = queries.players(data_dir)
+
+    def miss() -> None:
+        # a query miss; the dimensions are rebuilt per data version, not per miss
+        clear_cache()
+        queries.players(data_dir)
+        queries.games(data_dir)
+
+    # sidebar master table
+    master = lambda: queries.load_master(picks, *MASTER_COLS)
+    case("load_master_cold", master, rows["bhr_def"], setup=lambda: clear_datasets() or miss())
+    case("load_master_warm", master, rows["bhr_def"])
+    sidebar = lambda: queries.team_games_index(picks, *MASTER_COLS)
+    case("team_games_index_cold", sidebar, rows["bhr_def"], setup=lambda: clear_datasets() or miss())
+    case("team_games_index_warm", sidebar, rows["bhr_def"], n=max(repeat, 100))
+
+    # build_app data path, per page schema
+    for label, path, schema in (("picks", picks, PICK_PAGE), ("drives", drives, DRIVE_PAGE)):
+        n = rows["bhr_def" if path == picks else "scr_def"]
+        case(f"load_page_data_cold[{label}]", lambda: _page_frame(path, schema), n, setup=clear_datasets)
+        data = _page_frame(path, schema)
+        index_cols = [c for c in ["DTeamAbbrev", "GameKey", schema["player_key_col"], schema["deftype_col"], schema["outcome_col"]] if c]
+        case(f"build_row_index[{label}]", lambda: data_store.build_row_index(data, index_cols), n)
+        index = data_store.build_row_index(data, index_cols)
+
+        team, game = _busiest_team_game(data)
+        sel = dict(team_value=team, game_id_value=game, defteam_col="DTeamAbbrev", game_id_col="GameKey")
+        case(f"apply_team_game_filter_to_df_index[{label}]",
+             lambda: queries.apply_team_game_filter_to_df(data, index=index, **sel), n)
+        case(f"apply_team_game_filter_to_df_scan[{label}]",
+             lambda: queries.apply_team_game_filter_to_df(data, **sel), n)
+        case(f"summary_pivot_all[{label}]",
+             lambda: queries.summary_pivot(data, schema["player_key_col"], schema["outcome_col"], "count", dim), n)
+
+        # the page-facing queries on a miss (memo cleared), for a single-game selection
+        ds = queries.dataset_spec(data_path=path, defteam_col="DTeamAbbrev", game_id_col="GameKey",
+                                  game_date_col="game_date", oteam_col="OTeamAbbrev", chance_col="chance_id", **schema)
+        case(f"defender_summary[{label}]", lambda: queries.defender_summary(ds, team, game), n, setup=miss)
+        case(f"chance_ids[{label}]", lambda: queries.chance_ids(ds, team, game), n, setup=miss)
+        warm = lambda: queries.defender_summary(ds, team, game)
+        case(f"defender_summary_cached[{label}]", warm, n, setup=warm)
+
+    # game cube: per-play aggregation, the merge of the four parts, and the persisted cube
+    parts = {}
+    for suffix, path in files.items():
+        _, label_col, id_col = PLAY_TYPES[suffix]
+        scored = game_cube.add_score_cols(game_cube.load_play_file(path), label_col)
+        case(f"agg_game_stat[{suffix}]", lambda: game_cube.agg_game_stat(scored, id_col), rows[suffix])
+        parts[suffix] = game_cube.play_part(game_cube.load_play_file(path), suffix)
+    case("merge_parts", lambda: game_cube.merge_parts(parts), sum(len(p) for p in parts.values()))
+    case("ensure_game_cube_cold", lambda: game_cube.ensure_game_cube(data_dir), all_rows,
+         setup=lambda: _drop_cube(data_dir), n=1)
+    # per play file inside a cold cube build (they run concurrently; total ~ the slowest)
+    _drop_cube(data_dir)
+    timings = {}
+    game_cube.ensure_game_cube(data_dir, timings)
+    for part, secs in timings.items():
+        records.append({"scale": scale, "case": f"ensure_game_cube_cold_part[{part}]",
+                        "rows": int(rows.get(part, all_rows)), "repeat": 1, "median_s": secs, "min_s": secs})
+    case("ensure_game_cube_warm", lambda: game_cube.ensure_game_cube(data_dir), all_rows)
+    team, game = _busiest_team_game(_page_frame(picks, PICK_PAGE))
+    queries.game_cube(data_dir)
+    case("game_summary", lambda: queries.game_summary(team, game, data_dir), all_rows,
+         setup=lambda: miss() or queries.game_cube(data_dir))
+
+    # cross-dataset chance lookup: building the key indexes, then one chance through them vs. a scan
+    case("chance_index_cold", lambda: queries.chance_index(data_dir), all_rows, setup=clear_datasets, n=1)
+    chance = str(load_table(picks, columns=["chance_id"])["chance_id"].iloc[rows["bhr_def"] // 2])
+    case("find_chances", lambda: queries.find_chances(chance, data_dir), all_rows, n=max(repeat, 100))
+    case("chance_scan", lambda: [data_store.dataset_view(p, ["chance_id"])["chance_id"].eq(chance) for p in files.values()],
+         all_rows)
+    case("chance_plays", lambda: queries.chance_plays(chance, data_dir), all_rows, setup=miss)
+
+    # standalone picks explorer
+    pick_df = queries.load_picks(picks)
+    case("make_summary[picks]", lambda: queries.make_summary(pick_df, dim), rows["bhr_def"])
+
+    clear_cache()
+    clear_datasets()
+    return records
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Time the dashboard data paths on synthetic data.")
+    ap.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="multiples of the test CSVs")
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per case (cold cases run once)")
+    ap.add_argument("--work-dir", type=Path, default=APP_DIR / ".bench_data", help="where synthetic files are kept")
+    ap.add_argument("--out", type=Path, help="write the JSON here instead of stdout")
+    args = ap.parse_args(argv)
+
+    results = []
+    for scale in args.scales:
+        print(f"scale {scale}x", file=sys.stderr)
+        results += bench_scale(generate(args.work_dir, scale), scale, args.repeat)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "pyarrow": data_store.pa.__version__ if data_store.HAS_ARROW else None,
+            "machine": platform.machine(),
+            "scales": args.scales,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1059 @@
+"""
+Columnar store for the defended-play CSVs.
+
+Each CSV is parsed once (in bounded chunks, with fixed dtypes) into a
+game-partitioned Parquet store under `.defense_cache/<name>/` next to the
+source and read back from there until the source file changes; single
+games can be added or replaced with ingest_games(). load_mapped() serves
+the columns as memory-mapped .npy files that every process shares, and
+dataset_view() / dataset_artifact() keep one copy of each dataset per
+process for every page and session to share. No streamlit in here so it
+can be used headless.
+"""
+import csv
+import functools
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as pads
+    import pyarrow.parquet as papq
+    HAS_ARROW = True
+except ImportError:  # no pyarrow -> plain CSV reads
+    HAS_ARROW = False
+
+CACHE_DIR_NAME = ".defense_cache"
+STORE_VERSION = 4  # bump when the stored layout / dtypes change
+
+# ids: nullable ints so a blank cell doesn't turn the column into float
+ID_COLS = ["SeasonKey", "GameKey", "DriveKey", "PickKey", "PlayerKey", "DPlayerKey"]
+
+# text cols: pinned so an all-blank column isn't inferred as float
+TEXT_COLS = [
+    "chance_id",
+    "game_date",
+    "OTeamAbbrev",
+    "DTeamAbbrev",
+    "firstName",
+    "lastName",
+    "pos",
+    "BhrPlayerName",
+    "BallHandlerDefenderName",
+    "scr_def_type",
+    "pick_defense_outcome",
+    "drive_label",
+    "drive_label_complex",
+    "severity_label",
+    "failure_mode",
+]
+
+CSV_DTYPES = {**{c: "Int64" for c in ID_COLS}, **{c: str for c in TEXT_COLS}}
+
+# low-cardinality labels -> category (chance_id is ~unique per row, stays text)
+CATEGORY_COLS = [c for c in TEXT_COLS if c != "chance_id"]
+
+# CSVs are converted this many rows at a time (bounds peak memory on a seed);
+# the dtypes of the columns not pinned above come from the first CSV_SAMPLE_ROWS
+CSV_CHUNK_ROWS = 200_000
+CSV_SAMPLE_ROWS = 10_000
+
+
+def _project(available, columns) -> list | None:
+    # keep file order; names the file doesn't have are skipped (pages check `in df.columns`)
+    if columns is None:
+        return None
+    wanted = set(columns)
+    return [c for c in available if c in wanted]
+
+
+def csv_header(path) -> list[str]:
+    """
+    The file's column names with repeated headers dropped: pandas would read
+    a second OTeamAbbrev as "OTeamAbbrev.1"; like ~df.columns.duplicated(),
+    the first occurrence wins.
+    """
+    with open(path, newline="", encoding="utf-8") as fh:
+        raw = next(csv.reader(fh), [])
+    mangled = pd.read_csv(path, nrows=0).columns
+    return [mangled[i] for i, name in enumerate(raw) if name not in raw[:i]]
+
+
+def csv_dtypes(path, header=None) -> dict:
+    """
+    Explicit dtype for every column of the file, so every chunk parses the
+    same way: ids / labels as in CSV_DTYPES, the rest from a leading sample
+    (whole numbers -> Int64, other numbers or all blank -> float64, else text).
+    """
+    header = csv_header(path) if header is None else header
+    pinned = {c: t for c, t in CSV_DTYPES.items() if c in header}
+    sample = pd.read_csv(path, usecols=header, dtype=pinned, nrows=CSV_SAMPLE_ROWS)
+    dtypes = {}
+    for c in header:
+        dt = sample[c].dtype
+        if c in pinned:
+            dtypes[c] = pinned[c]
+        elif pd.api.types.is_bool_dtype(dt):
+            dtypes[c] = "boolean"
+        elif pd.api.types.is_integer_dtype(dt):
+            dtypes[c] = "Int64"
+        elif pd.api.types.is_numeric_dtype(dt):
+            dtypes[c] = "float64"
+        else:
+            dtypes[c] = str
+    return dtypes
+
+
+class CsvDtypeConflict(ValueError):
+    """A chunk of a CSV column doesn't fit the dtype its sample gave it; `dtype` is the wider one to retry with."""
+
+    def __init__(self, column: str, dtype):
+        super().__init__(f"{column}: values past the {CSV_SAMPLE_ROWS:,}-row sample don't fit its dtype")
+        self.column, self.dtype = column, dtype
+
+
+def _read_csv(path, columns=None, overrides=None, **kwargs):
+    # pd.read_csv with ids / text pinned as in csv_dtypes() (`overrides` wins);
+    # numeric and bool columns are left to pandas' own (fast) inference and
+    # held to their sample dtype afterwards by _fit_dtypes
+    header = csv_header(path)
+    usecols = header if columns is None else _project(header, columns)
+    dtypes = {**csv_dtypes(path, header), **(overrides or {})}
+    fit = {c: dtypes[c] for c in usecols if dtypes[c] in ("Int64", "float64", "boolean") and c not in ID_COLS}
+    parse = {c: dtypes[c] for c in usecols if c not in fit}
+    return pd.read_csv(path, usecols=usecols, dtype=parse, **kwargs), fit
+
+
+def _coerce(s: pd.Series, dtype) -> pd.Series | None:
+    # s as `dtype`, or None if one of its values doesn't fit
+    if s.isna().all():
+        return s.astype(dtype)
+    if dtype == "boolean":
+        try:
+            return s.astype("boolean")
+        except (TypeError, ValueError):
+            return None
+    if pd.api.types.is_bool_dtype(s.dtype) or not pd.api.types.is_numeric_dtype(s.dtype):
+        return None
+    if dtype == "Int64" and pd.api.types.is_float_dtype(s.dtype):
+        v = s.to_numpy()
+        if not np.all(np.isnan(v) | (np.isfinite(v) & (v == np.trunc(v)))):
+            return None
+    return s.astype(dtype)
+
+
+def _fit_dtypes(df: pd.DataFrame, fit: dict, strict: bool) -> pd.DataFrame:
+    # inferred columns as their sample dtype; one that doesn't fit raises
+    # CsvDtypeConflict (strict: chunks must agree) or keeps what pandas read
+    for c, dtype in fit.items():
+        s = _coerce(df[c], dtype)
+        if s is not None:
+            df[c] = s
+        elif strict:
+            numeric = pd.api.types.is_numeric_dtype(df[c].dtype) and not pd.api.types.is_bool_dtype(df[c].dtype)
+            raise CsvDtypeConflict(c, "float64" if dtype == "Int64" and numeric else str)
+    return df
+
+
+def iter_csv_chunks(path, columns=None, chunksize=None, overrides=None):
+    """
+    Normalized frames of at most `chunksize` rows (default CSV_CHUNK_ROWS)
+    over the file, parsed with csv_dtypes() plus `overrides`; always yields
+    at least one frame. Raises CsvDtypeConflict when a later chunk doesn't
+    fit the sampled dtype (ensure_store then reruns with it widened).
+    """
+    reader, fit = _read_csv(path, columns, overrides, chunksize=chunksize or CSV_CHUNK_ROWS)
+    with reader:
+        for chunk in reader:
+            yield normalize_frame(_fit_dtypes(chunk, fit, strict=True))
+
+
+def read_csv_typed(path, columns=None) -> pd.DataFrame:
+    # the whole file in one frame, parsed like iter_csv_chunks (not normalized);
+    # a column the sample got wrong keeps the dtype pandas read it with
+    df, fit = _read_csv(path, columns)
+    return _fit_dtypes(df, fit, strict=False)
+
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One pass that puts a freshly parsed frame into its compact form:
+    stripped labels as category, ids and other whole-number columns as int64
+    (Int64 only if blanks exist), float metrics as float32.
+    """
+    for c in df.columns:
+        s = df[c]
+        if c in CATEGORY_COLS:
+            df[c] = s.str.strip().astype("category")
+        elif c == "chance_id":
+            df[c] = s.str.strip()
+        elif c in ID_COLS or isinstance(s.dtype, pd.Int64Dtype):
+            df[c] = s.astype("int64") if not s.isna().any() else s.astype("Int64")
+        elif pd.api.types.is_float_dtype(s.dtype):
+            df[c] = s.astype("float32")
+    return df
+
+
+def match_value(s: pd.Series, value: str, *, lower: bool = False) -> np.ndarray:
+    """
+    Boolean mask for `s == value`, where `value` is a widget string.
+    Categories are compared on codes, ids as ints; nothing is stringified per row.
+    `lower=True` compares case-insensitively.
+    """
+    value = str(value).lower() if lower else str(value)
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        labels = s.cat.categories.astype(str)
+        hit = np.flatnonzero((labels.str.lower() if lower else labels) == value)
+        return np.isin(s.cat.codes.to_numpy(), hit)
+    if pd.api.types.is_integer_dtype(s.dtype):
+        try:
+            v = int(value)
+        except ValueError:
+            return np.zeros(len(s), dtype=bool)
+        return (s == v).fillna(False).to_numpy(dtype=bool)
+    x = s.astype(str).str.strip()
+    return ((x.str.lower() if lower else x) == value).to_numpy()
+
+
+def distinct_values(s: pd.Series) -> list:
+    """Sorted distinct non-null values of `s` as strings (read off the codes for categories)."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes = np.unique(s.cat.codes.to_numpy())
+        return sorted(s.cat.categories[codes[codes >= 0]].astype(str).tolist())
+    return sorted(s.dropna().astype(str).str.strip().unique().tolist())
+
+
+def label_by_group(df: pd.DataFrame, cols: list[str], make_label) -> pd.Series:
+    """
+    Row-wise display label built from `cols`, returned as a category.
+    `make_label` runs on the distinct combinations only and is broadcast back,
+    so the string work doesn't scale with row count.
+    """
+    keys = df[cols]
+    group_ids = keys.groupby(cols, dropna=False, observed=True, sort=False).ngroup().to_numpy()
+    labels = np.asarray(make_label(keys.drop_duplicates()), dtype=object)
+    codes, cats = pd.factorize(labels)
+    return pd.Series(
+        pd.Categorical.from_codes(codes[group_ids], categories=cats),
+        index=df.index,
+    )
+
+
+def _codes_and_labels(s: pd.Series) -> tuple[np.ndarray, list[str]]:
+    # integer code per row (-1 = missing) + the string label of each code
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.cat.codes.to_numpy(), s.cat.categories.astype(str).tolist()
+    codes, uniques = pd.factorize(s)
+    return codes, pd.Index(uniques).astype(str).tolist()
+
+
+def build_row_index(df: pd.DataFrame, cols: list[str]) -> dict:
+    """
+    Inverted index {col: {value: sorted row positions}} for the filter columns.
+    Values are keyed by their widget string (GameKey as "20000000101" etc.);
+    each position array is a slice of one argsort per column.
+    """
+    index = {}
+    for c in cols:
+        if c not in df.columns:
+            continue
+        codes, labels = _codes_and_labels(df[c])
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+        index[c] = {lab: order[bounds[i]:bounds[i + 1]] for i, lab in enumerate(labels)}
+    return index
+
+
+def lookup_rows(index: dict, n_rows: int, filters: dict) -> np.ndarray:
+    """
+    Sorted row positions matching every non-empty filter ({col: [values]}).
+    Values within a column are OR-ed, columns are AND-ed; columns that aren't
+    indexed are ignored, so callers only pass what they indexed.
+    """
+    rows = None
+    for col, selected in filters.items():
+        if not selected or col not in index:
+            continue
+        postings = index[col]
+        hits = [postings[v] for v in selected if v in postings]
+        if not hits:
+            return np.empty(0, dtype=np.intp)
+        pos = hits[0] if len(hits) == 1 else np.unique(np.concatenate(hits))
+        rows = pos if rows is None else np.intersect1d(rows, pos, assume_unique=True)
+    return np.arange(n_rows) if rows is None else rows
+
+
+def build_key_index(s: pd.Series) -> tuple[pd.Index, np.ndarray, np.ndarray]:
+    """
+    Hash index of one key column (chance_id, PickKey, ...): (distinct values,
+    row order, bounds), the rows holding values[i] being
+    order[bounds[i]:bounds[i + 1]]. Flat arrays rather than build_row_index's
+    dict of position arrays, so a near-unique key stays small.
+    """
+    codes, uniques = pd.factorize(s)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    values = pd.Index(uniques)
+    values.get_indexer(values[:1])  # build the hash table now, not on the first lookup
+    return values, order, bounds
+
+
+def key_rows(index: tuple, value) -> np.ndarray:
+    """Sorted row positions holding `value` in a build_key_index index (empty if it has none)."""
+    values, order, bounds = index
+    i = values.get_indexer([value])[0]
+    return order[bounds[i]:bounds[i + 1]] if i >= 0 else np.empty(0, dtype=np.intp)
+
+
+def take_rows(df: pd.DataFrame, rows=None, columns=None) -> pd.DataFrame:
+    """
+    `columns` of df (a list, or {name: new name}) at `rows` (positions or a
+    boolean mask) as a new frame. Shares df's arrays when every row is kept,
+    otherwise each column is taken once; df itself is never copied whole.
+    """
+    if rows is not None:
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = None if rows.all() else np.flatnonzero(rows)
+        elif len(rows) == len(df) and (len(rows) == 0 or (rows[0] == 0 and rows[-1] == len(df) - 1)):
+            rows = None  # sorted unique positions covering every row
+    names = dict(zip(df.columns, df.columns)) if columns is None else (
+        columns if isinstance(columns, dict) else dict(zip(columns, columns))
+    )
+    data = {new: df[old] if rows is None else df[old].take(rows) for old, new in names.items()}
+    if not data:
+        return df.iloc[:, :0] if rows is None else df.iloc[rows, :0]
+    return pd.DataFrame(data, copy=False)
+
+
+def _value_mask(codes: np.ndarray, labels: list[str], selected) -> np.ndarray:
+    # lookup table over codes; slot -1 (missing) is never selected
+    wanted = set(map(str, selected))
+    lut = np.zeros(len(labels) + 1, dtype=bool)
+    lut[[i for i, lab in enumerate(labels) if lab in wanted]] = True
+    return lut[codes]
+
+
+def filter_mask(df: pd.DataFrame, filters: dict) -> np.ndarray:
+    """AND of the non-empty filters ({col: [values]}) as one boolean mask."""
+    mask = np.ones(len(df), dtype=bool)
+    for col, selected in filters.items():
+        if selected:
+            mask &= _value_mask(*_codes_and_labels(df[col]), selected)
+    return mask
+
+
+def cascade_facets(df: pd.DataFrame, filters: dict, facets: list[str]) -> dict[str, pd.Series]:
+    """
+    Cascading filter options with counts.
+
+    For each facet column: how many rows have each value once every *other*
+    active filter is applied (its own selection is left out, so picking one
+    value doesn't hide the rest). Returns {facet: counts indexed by value},
+    zero-count values dropped, sorted by value.
+
+    One mask per active filter; the "all but one" masks come from prefix/suffix
+    ANDs, so adding facets adds one bincount each instead of another full
+    filter pass per facet.
+    """
+    n = len(df)
+    coded = {c: _codes_and_labels(df[c]) for c in dict.fromkeys([*filters, *facets])}
+    active = [c for c, sel in filters.items() if sel]
+    masks = [_value_mask(*coded[c], filters[c]) for c in active]
+
+    # prefix[i] = masks[:i] AND-ed, suffix[i] = masks[i:] AND-ed
+    prefix = [np.ones(n, dtype=bool)]
+    for m in masks:
+        prefix.append(prefix[-1] & m)
+    suffix = [np.ones(n, dtype=bool)]
+    for m in reversed(masks):
+        suffix.append(suffix[-1] & m)
+    suffix.reverse()
+
+    out = {}
+    for col in facets:
+        codes, labels = coded[col]
+        if col in active:
+            i = active.index(col)
+            keep = prefix[i] & suffix[i + 1]
+        else:
+            keep = prefix[-1]
+        hit = codes[keep]
+        counts = np.bincount(hit[hit >= 0], minlength=len(labels))
+        nz = np.flatnonzero(counts)
+        out[col] = pd.Series(counts[nz], index=np.asarray(labels, dtype=object)[nz], name=col).sort_index()
+    return out
+
+
+def crosstab(rows: pd.Series, cols: pd.Series) -> tuple[np.ndarray, pd.Index, list[str]]:
+    """
+    Counts of every (row value, col label) pair in one np.bincount pass over
+    integer codes. Returns the [rows x cols] count matrix, the distinct row
+    values (sorted) and the col labels seen (sorted; a missing col value is
+    counted as "nan").
+    """
+    rcode, rvals = pd.factorize(rows, sort=True, use_na_sentinel=False)
+    ccode, labels = _codes_and_labels(cols)
+    labels = ["nan", *labels]  # col code + 1, so missing (-1) lands on "nan"
+    n_cols = len(labels)
+    rcode *= n_cols
+    rcode += ccode
+    rcode += 1
+    counts = np.bincount(rcode, minlength=len(rvals) * n_cols).reshape(len(rvals), n_cols)
+    seen = np.flatnonzero(counts.any(axis=0))
+    seen = seen[np.argsort(np.asarray(labels, dtype=object)[seen], kind="stable")]
+    return counts[:, seen], pd.Index(rvals), [labels[i] for i in seen]
+
+
+def store_dir_for(csv_path) -> Path:
+    src = Path(csv_path).resolve()
+    return src.parent / CACHE_DIR_NAME / src.stem
+
+
+def table_exists(csv_path) -> bool:
+    # a play file counts if its CSV or an ingested store for it exists
+    return Path(csv_path).exists() or (store_dir_for(csv_path) / "_meta.json").exists()
+
+
+def _file_sha1(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def read_json(meta_path: Path) -> dict:
+    try:
+        return json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def write_atomic(path: Path, write) -> None:
+    # write to a temp file then rename, so readers never see half a file
+    tmp = path.with_name(path.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _write_meta(store: Path, meta: dict) -> None:
+    # "state" names this exact store content (see load_mapped)
+    meta["state"] = _store_state(meta)
+    store.mkdir(parents=True, exist_ok=True)
+    write_atomic(store / "_meta.json", lambda p: p.write_text(json.dumps(meta, indent=1)))
+
+
+def data_version(paths) -> str:
+    """
+    Cheap version token for a set of datasets (mtime + size, no reads): the
+    source CSV and its store meta, which is rewritten on every ingest.
+    Use it as a cache key.
+    """
+    cwd = os.getcwd()
+    parts = []
+    for p in paths:
+        for name, f in _stat_targets(str(p), cwd):
+            try:
+                st = os.stat(f)
+                parts.append(f"{name}:{st.st_mtime_ns}:{st.st_size}")
+            except OSError:
+                parts.append(f"{name}:missing")
+    return "|".join(parts)
+
+
+@functools.lru_cache(maxsize=1024)
+def _stat_targets(path: str, cwd: str) -> tuple:
+    # (name, file) pairs data_version stats for a dataset; resolving the store
+    # dir is the slow part, so it's done once per (path, cwd)
+    meta = store_dir_for(path) / "_meta.json"
+    return ((Path(path).name, path), (meta.name, str(meta)))
+
+
+@functools.lru_cache(maxsize=1024)
+def _resolved(path: str, cwd: str) -> str:
+    return str(Path(path).resolve())
+
+
+# -----------------------------
+# Game-partitioned store under .defense_cache/<stem>/:
+#   base.parquet           the CSV seed, written chunk by chunk with rows grouped by game
+#                          within each chunk; meta records each game's row ranges
+#   delta/<season>/<game>.parquet   games pushed by ingest_games(); override the base range
+# -----------------------------
+PARTITION_COLS = ["SeasonKey", "GameKey"]
+COMPACT_AFTER = 64  # fold deltas back into base.parquet once there are this many
+
+_ARROW_TYPES = {"string": "string", "int64": "int64", "float": "float32", "double": "float64", "bool": "bool_"}
+
+
+def _arrow_type(s: pd.Series):
+    # one canonical arrow type per pandas dtype so base and deltas share a schema
+    dt = s.dtype
+    if pd.api.types.is_bool_dtype(dt):
+        return pa.bool_()
+    if pd.api.types.is_integer_dtype(dt):
+        return pa.int64()
+    if dt == np.float32:
+        return pa.float32()
+    if pd.api.types.is_float_dtype(dt):
+        return pa.float64()
+    return pa.string()
+
+
+def _schema_from_meta(meta: dict):
+    return pa.schema([(name, getattr(pa, _ARROW_TYPES[t])()) for name, t in meta["schema"]])
+
+
+def _merge_schema(meta: dict, df: pd.DataFrame):
+    # columns keep the type they were first stored with; new ones are appended
+    known = dict(meta.get("schema", []))
+    for c in df.columns:
+        if c not in known:
+            known[c] = str(_arrow_type(df[c]))
+    meta["schema"] = list(known.items())
+    return _schema_from_meta(meta)
+
+
+def partition_keys(df: pd.DataFrame) -> pd.Series:
+    """Per-row partition key ("<SeasonKey>/<GameKey>"), as used in the store meta."""
+    parts = []
+    for c in PARTITION_COLS:
+        s = df[c].astype(object) if c in df.columns else pd.Series(None, index=df.index, dtype=object)
+        parts.append(s.where(s.notna(), "none").astype(str))
+    return parts[0] + "/" + parts[1]
+
+
+def _group_by_game(df: pd.DataFrame):
+    """
+    Rows reordered so each game is contiguous (stable within a game), plus
+    {key: (start, n, content hash)}. The hash is order-insensitive and is
+    computed for all rows in one vectorized pass.
+    """
+    keys = partition_keys(df).to_numpy()
+    order = np.argsort(keys, kind="stable")
+    df, keys = df.take(order), keys[order]
+    row_hash = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    uniq, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    sums = np.add.reduceat(row_hash, starts) if len(starts) else []
+    return df, {k: (int(st), int(n), str(int(h))) for k, st, n, h in zip(uniq, starts, counts, sums)}
+
+
+def _column_array(s: pd.Series, typ):
+    # s as an arrow array of the stored type `typ`, or None if a value
+    # doesn't fit it (1.5 in an int64 column, text in a float one, ...)
+    try:
+        arr = pa.array(s, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        if typ != pa.string():
+            return None
+        arr = pa.array(s.where(s.isna(), s.astype(str)), from_pandas=True)  # mixed-type text column
+    if arr.type == typ:
+        return arr
+    try:
+        return pc.cast(arr, typ, safe=True)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+        return None
+
+
+def _to_table(df: pd.DataFrame, schema):
+    # every column of `schema` in its order, cast to its stored type; ones
+    # df lacks (e.g. only some games were ingested with them) are null
+    arrays = []
+    for field in schema:
+        if field.name not in df.columns:
+            arrays.append(pa.nulls(len(df), field.type))
+            continue
+        arr = _column_array(df[field.name], field.type)
+        if arr is None:
+            raise ValueError(f"{field.name}: values don't fit the stored type {field.type}")
+        arrays.append(arr)
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _fit_schema(meta: dict, df: pd.DataFrame):
+    """
+    _merge_schema, with every stored column df's values don't fit widened
+    in meta (int64 -> double for fractions, anything else -> string), the
+    way _seed_base widens a CSV column; the store reads its older files
+    back as the wider type.
+    """
+    _merge_schema(meta, df)
+    types = dict(meta["schema"])
+    for c in df.columns:
+        while _column_array(df[c], getattr(pa, _ARROW_TYPES[types[c]])()) is None:
+            if types[c] == "string":
+                raise ValueError(f"{c}: values can't be stored as text")
+            fractional = types[c] == "int64" and pd.api.types.is_float_dtype(df[c].dtype)
+            types[c] = "double" if fractional else "string"
+    meta["schema"] = list(types.items())
+    return _schema_from_meta(meta)
+
+
+def _write_base(store: Path, frames, meta: dict) -> dict:
+    """
+    Stream normalized `frames` into base.parquet, one row group per frame
+    with its rows grouped by game, so only one frame is in memory at a time.
+    Returns {key: (row ranges, rows, content hash)}: a game that spans frames
+    has one [start, n] range per frame; hashes add up across frames.
+    """
+    layout = {}
+    store.mkdir(parents=True, exist_ok=True)
+
+    def write(path):
+        offset, writer = 0, None
+        try:
+            for df in frames:
+                schema = _merge_schema(meta, df)
+                df, games = _group_by_game(df)
+                if writer is None:
+                    writer = papq.ParquetWriter(path, schema)
+                writer.write_table(_to_table(df, schema))
+                for key, (start, n, h) in games.items():
+                    ranges, rows, total = layout.get(key, ([], 0, 0))
+                    layout[key] = (ranges + [[offset + start, n]], rows + n, (total + int(h)) % 2**64)
+                offset += len(df)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    write_atomic(store / "base.parquet", write)
+    return {key: (ranges, n, str(h)) for key, (ranges, n, h) in layout.items()}
+
+
+def _seed_base(store: Path, src: Path, meta: dict) -> dict:
+    # _write_base from the CSV; a column whose later rows don't fit its
+    # sampled dtype is widened (Int64 -> float64 -> text) and the seed rerun
+    overrides = {}
+    while True:
+        trial = dict(meta)
+        try:
+            layout = _write_base(store, iter_csv_chunks(src, overrides=overrides), trial)
+        except CsvDtypeConflict as e:
+            overrides[e.column] = e.dtype
+            continue
+        meta.update(trial)
+        return layout
+
+
+def _delta_path(store: Path, key: str) -> Path:
+    return store / "delta" / f"{key}.parquet"
+
+
+def _drop_delta(store: Path, key: str) -> None:
+    _delta_path(store, key).unlink(missing_ok=True)
+
+
+def ensure_store(csv_path) -> Path:
+    """
+    Return the store dir for `csv_path`, re-seeding it from the CSV if the CSV
+    changed.
+
+    mtime+size is the cheap check; if those moved we hash the file, and only
+    re-parse when the hash differs too (a touched-but-identical file is kept).
+    On a re-seed, games pushed through ingest_games() (marked "ingested",
+    compacted or not) keep their delta unless the CSV's own rows for that
+    game changed (newest change wins). A dataset with no CSV at all is fine
+    as long as something was ingested.
+    """
+    src = Path(csv_path).resolve()
+    store = store_dir_for(src)
+    meta = read_json(store / "_meta.json")
+    if meta.get("version") != STORE_VERSION:
+        meta = {}
+
+    if not src.exists():
+        if meta:
+            return store
+        raise FileNotFoundError(src)
+
+    st = src.stat()
+    stamp = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+    if meta and all(meta.get(k) == v for k, v in stamp.items()):
+        return store
+
+    digest = _file_sha1(src)
+    if not (meta and meta.get("sha1") == digest):
+        layout = _seed_base(store, src, meta)
+        old = meta.get("games", {})
+        games = {}
+        for key, (ranges, n, h) in layout.items():
+            prev = old.get(key, {})
+            if _kept_delta(store, key, prev) and prev.get("csv_hash") == h:
+                # ingested since the last seed and the CSV hasn't touched it: read the delta again
+                games[key] = {**prev, "base": ranges, "delta": True}
+                continue
+            _drop_delta(store, key)
+            games[key] = {"hash": h, "csv_hash": h, "rows": n, "base": ranges}
+        # ingest-only games survive a re-seed; CSV games that left the CSV go
+        for key, prev in old.items():
+            if key not in games:
+                if _kept_delta(store, key, prev) and prev.get("hash") != prev.get("csv_hash"):
+                    games[key] = {**{k: v for k, v in prev.items() if k not in ("base", "csv_hash")}, "delta": True}
+                else:
+                    _drop_delta(store, key)
+        meta["games"] = games
+
+    meta.update({"version": STORE_VERSION, "source": str(src), "sha1": digest, **stamp})
+    _write_meta(store, meta)
+    return store
+
+
+def ingest_games(csv_path, df: pd.DataFrame) -> list[str]:
+    """
+    Add or replace whole games in the dataset behind `csv_path`.
+
+    `df` is raw rows for one play type (any number of games, e.g. one game's
+    export). Each (SeasonKey, GameKey) in it is written as its own small delta
+    file that replaces that game; nothing else is read or rewritten until
+    COMPACT_AFTER deltas pile up. Returns the partition keys written.
+    """
+    store = store_dir_for(csv_path)
+    if Path(csv_path).exists():
+        ensure_store(csv_path)
+    meta = read_json(store / "_meta.json")
+    if meta.get("version") != STORE_VERSION:
+        meta = {"version": STORE_VERSION}
+
+    df = normalize_frame(df.copy())
+    df, layout = _group_by_game(df)
+    # every game is converted before anything is written, so input that
+    # can't be stored leaves the store (deltas and meta) as it was
+    trial = dict(meta)
+    table = _to_table(df, _fit_schema(trial, df))
+    meta = trial
+
+    games = meta.setdefault("games", {})
+    for key, (start, n, h) in layout.items():
+        path, part = _delta_path(store, key), table.slice(start, n)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, lambda p: papq.write_table(part, p))
+        games[key] = {**games.get(key, {}), "hash": h, "rows": n, "delta": True, "ingested": True}
+
+    if sum(1 for g in games.values() if g.get("delta")) >= COMPACT_AFTER:
+        _compact(store, meta)
+    _write_meta(store, meta)
+    return list(layout)
+
+
+def _compact(store: Path, meta: dict) -> None:
+    # rewrite base.parquet with the deltas folded in; the delta files and the
+    # "ingested" mark stay (with csv_hash) so a later re-seed from the CSV,
+    # which rewrites base, can bring the ingested games back
+    df = _read_store(store, meta=meta)
+    layout = _write_base(store, [df], meta)
+    for key, (ranges, _, _) in layout.items():
+        g = meta["games"][key]
+        g.pop("delta", None)
+        g["base"] = ranges
+
+
+def _kept_delta(store: Path, key: str, g: dict) -> bool:
+    # an ingested game whose rows are still on disk as its delta file
+    return bool(g.get("ingested") or g.get("delta")) and _delta_path(store, key).exists()
+
+
+def store_games(csv_path) -> dict[str, str]:
+    """{partition key: content hash} for every game currently in the store."""
+    store = ensure_store(csv_path)
+    return {k: g["hash"] for k, g in read_json(store / "_meta.json").get("games", {}).items()}
+
+
+def _base_ranges(entries: list[dict]) -> list[tuple[int, int]]:
+    # row ranges to keep from base.parquet, adjacent ones merged
+    ranges = sorted(tuple(r) for g in entries if "base" in g and not g.get("delta") for r in g["base"])
+    merged = []
+    for start, n in ranges:
+        if merged and merged[-1][0] + merged[-1][1] == start:
+            merged[-1] = (merged[-1][0], merged[-1][1] + n)
+        else:
+            merged.append((start, n))
+    return merged
+
+
+def _read_store(store: Path, columns=None, games=None, meta=None) -> pd.DataFrame:
+    meta = meta or read_json(store / "_meta.json")
+    schema = _schema_from_meta(meta)
+    cols = _project(schema.names, columns)
+    all_games = meta.get("games", {})
+    keys = sorted(all_games if games is None else set(games) & set(all_games))
+    entries = [all_games[k] for k in keys]
+
+    pieces = []
+    ranges = _base_ranges(entries)
+    if ranges:
+        # one file, only the projected columns decoded; games are row slices
+        base = pads.dataset(store / "base.parquet", schema=schema, format="parquet").to_table(columns=cols)
+        whole = len(ranges) == 1 and ranges[0] == (0, base.num_rows)
+        pieces += [base] if whole else [base.slice(start, n) for start, n in ranges]
+    deltas = [_delta_path(store, k) for k, g in zip(keys, entries) if g.get("delta")]
+    if deltas or not pieces:
+        pieces.append(pads.dataset(deltas, schema=schema, format="parquet").to_table(columns=cols))
+    table = pa.concat_tables(pieces)
+
+    # labels are stored as plain strings; dictionary-encode in arrow so pandas gets categories
+    for i, name in enumerate(table.column_names):
+        if name in CATEGORY_COLS:
+            table = table.set_column(i, name, pc.dictionary_encode(table.column(i)))
+    df = table.to_pandas(ignore_metadata=True)
+
+    # arrow hands back nullable ints as float and blank text as None
+    for c in df.columns:
+        if c in ID_COLS and pd.api.types.is_float_dtype(df[c].dtype):
+            df[c] = df[c].astype("Int64")
+        elif df[c].dtype == object:
+            df[c] = df[c].fillna(np.nan)
+    return df
+
+
+def load_table(csv_path, columns=None, games=None) -> pd.DataFrame:
+    """
+    Read a defended-play dataset through the partitioned columnar store.
+
+    `columns` limits the read to the columns a page actually uses; only those
+    are decoded from the Parquet files. `games` (partition keys, see
+    store_games) limits it to those games' partitions. Falls back to parsing
+    the CSV directly if pyarrow is missing or the cache dir isn't writable.
+    """
+    if not HAS_ARROW:
+        return _csv_fallback(csv_path, columns, games)
+    try:
+        store = ensure_store(csv_path)
+    except OSError:
+        if not Path(csv_path).exists():
+            raise
+        return _csv_fallback(csv_path, columns, games)
+    return _read_store(store, columns, games)
+
+
+def _csv_fallback(csv_path, columns=None, games=None) -> pd.DataFrame:
+    if games is None:
+        return normalize_frame(read_csv_typed(csv_path, columns))
+    df = normalize_frame(read_csv_typed(csv_path, None if columns is None else [*columns, *PARTITION_COLS]))
+    df = df[partition_keys(df).isin(set(games)).to_numpy()]
+    return df if columns is None else df[_project(df.columns, columns)]
+
+
+def read_parquet(path, columns=None) -> pd.DataFrame:
+    df = pd.read_parquet(path, columns=_project(papq.read_schema(path).names, columns))
+    # parquet hands blank text back as None; keep NaN like read_csv so .astype(str) still gives "nan"
+    text = [c for c in df.columns if df[c].dtype == object]
+    if text:
+        df[text] = df[text].fillna(np.nan)
+    return df
+
+
+# -----------------------------
+# Memory-mapped columns under .defense_cache/<stem>/mmap/<state>/, one set
+# per store state (any ingest / re-seed starts a new one):
+#   <i>.npy        values (category / text columns: int codes)
+#   <i>.mask.npy   missing flags of a nullable int column
+#   <i>.text.npy   distinct values of a text column
+#   <i>.json       name, kind, categories; written last, marks the column done
+# Every process maps them read-only, so server processes share one copy in
+# the OS page cache instead of each parsing its own.
+# -----------------------------
+MMAP_DIR_NAME = "mmap"
+
+
+def _store_state(meta: dict) -> str:
+    blob = json.dumps([STORE_VERSION, meta.get("schema"), meta.get("games")], sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()[:16]
+
+
+def _save_npy(path: Path, values: np.ndarray) -> None:
+    def write(p):
+        with open(p, "wb") as fh:
+            np.save(fh, values, allow_pickle=False)
+    write_atomic(path, write)
+
+
+def _export_column(base: Path, i: int, s: pd.Series) -> None:
+    desc = {"name": s.name}
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        values = s.cat.codes.to_numpy()
+        desc.update(kind="category", categories=s.cat.categories.astype(str).tolist())
+    elif isinstance(s.dtype, pd.Int64Dtype):
+        values = s.to_numpy(dtype="int64", na_value=0)
+        _save_npy(base / f"{i:03d}.mask.npy", s.isna().to_numpy())
+        desc["kind"] = "nullable"
+    elif s.dtype == object:
+        # text is stored as codes into its distinct values; decoded per process
+        codes, uniques = pd.factorize(s)
+        values = codes.astype(np.int32)
+        _save_npy(base / f"{i:03d}.text.npy", np.array([str(u) for u in uniques], dtype=str))
+        desc["kind"] = "text"
+    else:
+        values = s.to_numpy()
+        desc["kind"] = "plain"
+    _save_npy(base / f"{i:03d}.npy", values)
+    write_atomic(base / f"{i:03d}.json", lambda p: p.write_text(json.dumps(desc)))
+
+
+def _load_npy(path: Path) -> np.ndarray:
+    # a plain read-only ndarray over the file's pages (numpy can't map an empty array)
+    values = np.load(path, mmap_mode="r", allow_pickle=False)
+    return values.view(np.ndarray) if values.size else np.load(path, allow_pickle=False)
+
+
+def _map_column(base: Path, i: int) -> pd.Series:
+    desc = read_json(base / f"{i:03d}.json")
+    values = _load_npy(base / f"{i:03d}.npy")
+    kind = desc["kind"]
+    if kind == "category":
+        values = pd.Categorical.from_codes(values, categories=desc["categories"])
+    elif kind == "nullable":
+        values = pd.arrays.IntegerArray(values, _load_npy(base / f"{i:03d}.mask.npy"))
+    elif kind == "text":
+        text = np.load(base / f"{i:03d}.text.npy", allow_pickle=False).astype(object)
+        values = np.append(text, np.nan)[values]
+    return pd.Series(values, name=desc["name"], copy=False)
+
+
+def load_mapped(csv_path, columns=None) -> pd.DataFrame:
+    """
+    load_table(), but over memory-mapped column files (no copy). A column is
+    exported with one store read the first time any process asks for it in
+    the current store state; every later load, in any process, maps it.
+    Numbers, ids and category codes are shared; text columns are decoded
+    per process. Falls back to load_table if the files can't be written.
+    """
+    if not HAS_ARROW:
+        return load_table(csv_path, columns)
+    try:
+        store = ensure_store(csv_path)
+        meta = read_json(store / "_meta.json")
+        names = [name for name, _ in meta.get("schema", [])]
+        wanted = names if columns is None else _project(names, columns)
+        base = store / MMAP_DIR_NAME / (meta.get("state") or _store_state(meta))
+        missing = [c for c in wanted if not (base / f"{names.index(c):03d}.json").exists()]
+        if missing:
+            if not base.exists():
+                # a new store state: the old files can go (mapped ones stay readable)
+                for old in base.parent.glob("*"):
+                    if old.name != base.name:
+                        shutil.rmtree(old, ignore_errors=True)
+                base.mkdir(parents=True, exist_ok=True)
+            df = _read_store(store, missing, meta=meta)
+            for c in missing:
+                _export_column(base, names.index(c), df[c])
+            del df
+        data = {c: _map_column(base, names.index(c)) for c in wanted}
+    except OSError:
+        return load_table(csv_path, columns)
+    if not data:
+        return pd.DataFrame(index=pd.RangeIndex(0))
+    return pd.DataFrame(data, copy=False)
+
+
+# ---- process-wide dataset registry ----
+# One entry per source file: the normalized columns loaded so far (each
+# mapped once through load_mapped, shared by every page / session as
+# read-only Series) and the artifacts derived from them (labels, row
+# indexes, ...). An entry is dropped as soon as data_version() of its file
+# changes. _REGISTRY_LOCK only guards the dicts; loads and artifact builds
+# run under per-entry / per-key locks.
+_REGISTRY: dict[str, dict] = {}
+_REGISTRY_LOCK = threading.RLock()
+
+
+def _registry_entry(csv_path) -> dict:
+    path = _resolved(str(csv_path), os.getcwd())
+    version = data_version([path])
+    with _REGISTRY_LOCK:
+        entry = _REGISTRY.get(path)
+        if entry is None or entry["version"] != version:
+            entry = {"path": path, "version": version, "cols": {}, "absent": set(), "complete": False, "artifacts": {}, "building": {}, "loading": threading.Lock()}
+            _REGISTRY[path] = entry
+        return entry
+
+
+def _missing_cols(entry: dict, columns) -> list | None:
+    # columns still to load (None = the whole file); call under _REGISTRY_LOCK
+    if columns is None:
+        return [] if entry["complete"] else None
+    return [c for c in dict.fromkeys(columns) if c not in entry["cols"] and c not in entry["absent"]]
+
+
+def dataset_view(csv_path, columns=None, extra: dict | None = None) -> pd.DataFrame:
+    """
+    Frame over the registry's shared columns of a dataset (no copy).
+
+    Columns not loaded yet are mapped once through load_mapped and kept for
+    every later caller; `extra` adds derived Series (same row order) without
+    copying them either. The frame is a view: filter / take / assign new
+    columns freely, but never write into it in place.
+    """
+    entry = _registry_entry(csv_path)
+    with _REGISTRY_LOCK:
+        missing = _missing_cols(entry, columns)
+    if missing is None or missing:
+        # loads (a re-seed at worst) run under the entry's own lock, so
+        # every other dataset stays served meanwhile
+        with entry["loading"]:
+            with _REGISTRY_LOCK:
+                missing = _missing_cols(entry, columns)  # loaded while we waited?
+            if missing is None or missing:
+                df = load_mapped(entry["path"], columns=missing)
+                with _REGISTRY_LOCK:
+                    for c in df.columns:
+                        entry["cols"].setdefault(c, df[c])
+                    if missing is None:
+                        entry["complete"] = True
+                    else:
+                        entry["absent"].update(set(missing) - set(df.columns))
+    with _REGISTRY_LOCK:
+        cols = entry["cols"]
+        names = list(cols) if columns is None else [c for c in dict.fromkeys(columns) if c in cols]
+        data = {c: cols[c] for c in names}
+    if extra:
+        data.update(extra)
+    if not data:
+        return pd.DataFrame(index=pd.RangeIndex(0))
+    return pd.DataFrame(data, copy=False)
+
+
+def dataset_artifact(csv_path, key, build, depends=None):
+    """
+    Memoize build() (labels, a row index, ...) per dataset version.
+
+    `key` must cover everything build depends on besides the file itself;
+    `depends` is a version token for inputs outside the file (other files'
+    data_version): when it changes the artifact is rebuilt in place. The
+    result is shared process-wide, so treat it as read-only.
+
+    build() runs under a lock of its own key, not the registry lock, so it
+    may call memoized queries (the dimensions) that read other datasets.
+    """
+    entry = _registry_entry(csv_path)
+    with _REGISTRY_LOCK:
+        hit = entry["artifacts"].get(key)
+        if hit is not None and hit[0] == depends:
+            return hit[1]
+        lock = entry["building"].setdefault(key, threading.Lock())
+    with lock:
+        with _REGISTRY_LOCK:
+            hit = entry["artifacts"].get(key)
+        if hit is None or hit[0] != depends:
+            hit = (depends, build())
+            with _REGISTRY_LOCK:
+                entry["artifacts"][key] = hit
+        return hit[1]
+
+
+def clear_datasets() -> None:
+    """Forget every registry entry (next access reloads); for tests / benchmarks."""
+    with _REGISTRY_LOCK:
+        _REGISTRY.clear()
@@ -0,0 +1,173 @@
+"""
+Dimension tables shared by the pages, the Game Summary and the picks explorer.
+
+One row per player keyed by the integer PlayerKey (DPlayerKey in the picks
+file) and one per game keyed by GameKey, built once per data version from
+every play file. Facts (page frames, the game cube) carry only the keys:
+filters and groupbys run on them and names / game labels are joined in for
+display. No streamlit in here.
+"""
+import numpy as np
+import pandas as pd
+
+from data_store import dataset_view
+from result_cache import memoized
+
+PLAYER_COLS = ["name", "pos", "team"]
+GAME_COLS = ["date", "date_str", "team_a", "team_b", "label", "ordinal"]
+
+
+def _name_label(u: pd.DataFrame, name_cols: list[str]) -> pd.Series:
+    # "first last" (or the single name column), stripped; missing parts are blank
+    parts = [u[c].astype(object).fillna("").astype(str).str.strip() for c in name_cols]
+    label = parts[0]
+    for p in parts[1:]:
+        label = label + " " + p
+    return label.str.strip()
+
+
+@memoized(lambda sources: [s[0] for s in sources])
+def player_dim(sources) -> pd.DataFrame:
+    """
+    Player dimension over `sources`, one (path, key col, name cols, team col,
+    game id col) per play file in precedence order: the first non-blank name
+    and pos per key, and the team of the player's latest game. Clashing names
+    get " (<key>)" appended so a name picked in a widget maps back to one key.
+    Indexed by PlayerKey, sorted by name.
+    """
+    attrs, teams = [], []
+    for path, key_col, name_cols, team_col, game_id_col in sources:
+        df = dataset_view(path, [key_col, *name_cols, "pos", team_col, game_id_col])
+        if key_col not in df.columns:
+            continue
+        df = df[df[key_col].notna()]
+
+        # name strings are built on the distinct (key, name, pos) rows only
+        u = df[[c for c in [key_col, *name_cols, "pos"] if c in df.columns]].drop_duplicates()
+        attrs.append(pd.DataFrame({
+            "PlayerKey": u[key_col].astype("int64").to_numpy(),
+            "name": _name_label(u, [c for c in name_cols if c in u.columns]).replace("", np.nan).to_numpy(),
+            "pos": u["pos"].astype(object).to_numpy() if "pos" in u.columns else None,
+        }))
+        if team_col in df.columns and game_id_col in df.columns:
+            t = df[[key_col, game_id_col, team_col]].dropna().drop_duplicates([key_col, game_id_col])
+            teams.append(pd.DataFrame({
+                "PlayerKey": t[key_col].astype("int64").to_numpy(),
+                "game": t[game_id_col].astype("int64").to_numpy(),
+                "team": t[team_col].astype(object).to_numpy(),
+            }))
+
+    if not attrs:
+        return pd.DataFrame(columns=PLAYER_COLS, index=pd.Index([], dtype="int64", name="PlayerKey"))
+
+    dim = pd.concat(attrs, ignore_index=True).groupby("PlayerKey", sort=True)[["name", "pos"]].first()
+    if teams:
+        latest = pd.concat(teams, ignore_index=True).sort_values("game", kind="mergesort")
+        dim["team"] = latest.groupby("PlayerKey")["team"].last()
+    else:
+        dim["team"] = None
+
+    keys = dim.index.astype(str)
+    dim["name"] = dim["name"].fillna(pd.Series(keys, index=dim.index))
+    clash = dim["name"].duplicated(keep=False).to_numpy()
+    dim.loc[clash, "name"] = dim["name"][clash] + " (" + keys[clash] + ")"
+    return dim[PLAYER_COLS].sort_values("name", kind="mergesort")
+
+
+def player_names(dim: pd.DataFrame, keys) -> np.ndarray:
+    """Display names for `keys` (one per key, duplicates fine); unknown keys show as the key."""
+    keys = pd.Index(keys)
+    pos = dim.index.get_indexer(keys)
+    names = dim["name"].to_numpy(dtype=object)
+    return np.where(pos >= 0, names[pos], keys.astype(str))
+
+
+def player_keys(dim: pd.DataFrame, names) -> list[int]:
+    """PlayerKeys of the display names in `names` (unknown names are skipped)."""
+    return dim.index[dim["name"].isin(list(names))].tolist()
+
+
+def player_filter(dim: pd.DataFrame, names) -> list[int]:
+    # a widget's name selection as a filter on the key column: no names = no
+    # filter, names that match no player keep no rows (-1 is never a key)
+    if not names:
+        return []
+    return player_keys(dim, names) or [-1]
+
+
+def _date_str(raw: pd.Series) -> pd.Series:
+    # normalized "%Y-%m-%d" where the date parses, the raw text otherwise
+    date = pd.to_datetime(raw, errors="coerce").dt.strftime("%Y-%m-%d")
+    return date.fillna(raw.astype(str)).astype(str).str.strip()
+
+
+@memoized(lambda sources: [s[0] for s in sources])
+def game_dim(sources) -> pd.DataFrame:
+    """
+    Game dimension over `sources`, one (path, game id col, date col, team
+    col, opp col) per play file in precedence order: per GameKey the first
+    non-blank date (parsed, and as text), both teams (alphabetical), a neutral
+    label "<date> <team_a> vs <team_b>" and `ordinal` (0 = oldest; by date,
+    then key). Indexed by GameKey.
+    """
+    dates, sides = [], []
+    for path, game_id_col, date_col, team_col, opp_col in sources:
+        df = dataset_view(path, [game_id_col, date_col, team_col, opp_col])
+        if game_id_col not in df.columns:
+            continue
+        u = df.drop_duplicates()
+        u = u[u[game_id_col].notna()]
+        game = u[game_id_col].astype("int64").to_numpy()
+        if date_col in u.columns:
+            dates.append(pd.DataFrame({"GameKey": game, "date": u[date_col].astype(object).to_numpy()}))
+        for c in (team_col, opp_col):
+            if c in u.columns:
+                sides.append(pd.DataFrame({"GameKey": game, "team": u[c].astype(object).to_numpy()}))
+
+    index = pd.Index([], dtype="int64", name="GameKey")
+    raw = pd.concat(dates, ignore_index=True).groupby("GameKey")["date"].first() if dates else pd.Series(index=index, dtype=object)
+
+    # the (up to) two distinct teams seen on either side of each game
+    if sides:
+        t = pd.concat(sides, ignore_index=True).dropna()
+        t["team"] = t["team"].astype(str).str.strip().str.upper()
+        t = t.drop_duplicates().sort_values(["GameKey", "team"], kind="mergesort")
+        t["side"] = t.groupby("GameKey").cumcount()
+        teams = t[t["side"] < 2].pivot(index="GameKey", columns="side", values="team").reindex(columns=[0, 1])
+    else:
+        teams = pd.DataFrame(index=index, columns=[0, 1], dtype=object)
+
+    dim = pd.DataFrame(index=raw.index.union(teams.index).rename("GameKey"))
+    raw = raw.reindex(dim.index)
+    dim["date"] = pd.to_datetime(raw, errors="coerce")
+    dim["date_str"] = _date_str(raw)
+    dim["team_a"] = teams[0].reindex(dim.index)
+    dim["team_b"] = teams[1].reindex(dim.index)
+    dim["label"] = (dim["date_str"] + " " + dim["team_a"].fillna("") + " vs " + dim["team_b"].fillna("")).str.strip()
+    order = dim.reset_index().sort_values(["date", "GameKey"], kind="mergesort", na_position="first").index
+    dim["ordinal"] = 0
+    dim.iloc[order, dim.columns.get_loc("ordinal")] = np.arange(len(dim))
+    return dim[GAME_COLS]
+
+
+def game_labels(dim: pd.DataFrame, games, teams=None) -> np.ndarray:
+    """
+    Display label per game in `games`: "<date> vs <opponent>" seen from the
+    matching entry of `teams` (a team in that game), the neutral label where
+    the team is missing or not in the game; unknown games show as the key.
+    """
+    games = pd.Index(games)
+    if not len(dim):
+        return np.asarray(games.astype(str), dtype=object)
+    pos = dim.index.get_indexer(games)
+    found = pos >= 0
+    pos = np.where(found, pos, 0)
+    label = dim["label"].to_numpy(dtype=object)[pos]
+    if teams is not None:
+        team = pd.Series(np.asarray(teams, dtype=object)).fillna("").astype(str).str.strip().str.upper().to_numpy(dtype=object)
+        a = dim["team_a"].fillna("").to_numpy(dtype=object)[pos]
+        b = dim["team_b"].fillna("").to_numpy(dtype=object)[pos]
+        opp = np.where(team == a, b, np.where(team == b, a, ""))
+        side = (team != "") & (opp != "")
+        label = np.where(side, dim["date_str"].to_numpy(dtype=object)[pos] + " vs " + opp, label)
+    return np.where(found, label, np.asarray(games.astype(str), dtype=object))
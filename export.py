@@ -0,0 +1,156 @@
+"""
+Export chance_id lists / filtered plays, e.g. for film sessions.
+
+    python export.py bhr_def --team OKC --game 20000000101 --out okc.csv
+    python export.py scr_def --outcome bad --out bad_switches.parquet
+    python export.py iso --batch selections.csv --out film.zip
+
+Rows come from queries.export_rows, a generator over the shared dataset:
+each selection's rows are taken EXPORT_CHUNK_ROWS at a time and written as
+they arrive, so a season-wide pull never holds more than one chunk. A
+--batch file is a CSV with any of the columns team, game, defender,
+outcome, deftype (blank = no filter). CSV and Parquet put every selection
+in one file; zip writes one CSV per selection.
+"""
+import argparse
+import io
+import re
+import time
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+
+from data_store import HAS_ARROW
+from queries import ALL, ALL_GAMES, ALL_TEAMS, EXPORT_CHUNK_ROWS, PLAY_PAGES, export_rows, play_dataset
+
+if HAS_ARROW:
+    import pyarrow as pa
+    import pyarrow.parquet as papq
+
+FORMATS = ("csv", "parquet", "zip")
+SELECTION_COLS = ("team", "game", "defender", "outcome", "deftype")
+
+
+def frame_chunks(df: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    # an in-memory result in export_rows-sized pieces (at least one, for the header)
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def csv_text(frames):
+    """CSV text of `frames` (same columns) piece by piece: the header once, then each frame's rows."""
+    header = True
+    for df in frames:
+        yield df.to_csv(index=False, header=header)
+        header = False
+
+
+def write_csv(frames, out) -> int:
+    """Stream `frames` into one CSV file; returns the rows written."""
+    rows = 0
+    with open(out, "w", newline="", encoding="utf-8") as fh:
+        for i, df in enumerate(frames):
+            df.to_csv(fh, index=False, header=i == 0)
+            rows += len(df)
+    return rows
+
+
+def _arrow_schema(df: pd.DataFrame):
+    # text columns stay strings even when a chunk has no values in them
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    return pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in schema])
+
+
+def write_parquet(frames, out) -> int:
+    """Stream `frames` into one Parquet file, a row group per non-empty frame; returns the rows written."""
+    rows, writer, last = 0, None, None
+    try:
+        for df in frames:
+            last = df
+            if df.empty:
+                continue
+            if writer is None:
+                writer = papq.ParquetWriter(out, _arrow_schema(df))
+            writer.write_table(pa.Table.from_pandas(df, schema=writer.schema, preserve_index=False))
+            rows += len(df)
+        if writer is None and last is not None:
+            papq.write_table(pa.Table.from_pandas(last, schema=_arrow_schema(last), preserve_index=False), out)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def _selection_name(i: int, sel: dict) -> str:
+    parts = [str(sel.get(c) or "") for c in SELECTION_COLS]
+    label = "_".join(p for p in parts if p and p not in (ALL, ALL_TEAMS, ALL_GAMES)) or "all"
+    return f"{i + 1:03d}_{re.sub(r'[^A-Za-z0-9.-]+', '-', label)}.csv"
+
+
+def write_zip(batches, selections: list[dict], out) -> int:
+    """Stream export_rows' (selection, frame) pairs into a zip, one CSV per selection; returns the rows written."""
+    rows, current, fh = 0, None, None
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        try:
+            for i, df in batches:
+                if i != current:
+                    if fh is not None:
+                        fh.close()
+                    member = zf.open(_selection_name(i, selections[i]), "w", force_zip64=True)
+                    fh = io.TextIOWrapper(member, encoding="utf-8", newline="")
+                    current, header = i, True
+                df.to_csv(fh, index=False, header=header)
+                header = False
+                rows += len(df)
+        finally:
+            if fh is not None:
+                fh.close()
+    return rows
+
+
+def export(play: str, selections: list[dict], out, fmt: str, data_dir=None, chunk_rows: int = EXPORT_CHUNK_ROWS) -> int:
+    """Write the rows of `selections` in one play type's dataset to `out`; returns the rows written."""
+    batches = export_rows(play_dataset(play, data_dir), selections, chunk_rows)
+    if fmt == "zip":
+        return write_zip(batches, selections, out)
+    frames = (df for _, df in batches)
+    return write_parquet(frames, out) if fmt == "parquet" else write_csv(frames, out)
+
+
+def read_selections(path) -> list[dict]:
+    # one selection per row; blank cells (or missing columns) mean no filter
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    cols = [c for c in SELECTION_COLS if c in df.columns]
+    return [{c: v.strip() for c, v in zip(cols, row) if v.strip()} for row in df[cols].itertuples(index=False)]
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Export the plays (with chance_id) matching one or more selections.")
+    ap.add_argument("play", choices=list(PLAY_PAGES), help="play type to export")
+    ap.add_argument("--out", type=Path, required=True, help="output file (.csv, .parquet or .zip)")
+    ap.add_argument("--format", choices=FORMATS, help="default: from the --out suffix")
+    ap.add_argument("--batch", type=Path, help="CSV of selections (team, game, defender, outcome, deftype)")
+    for c in SELECTION_COLS:
+        ap.add_argument(f"--{c}", help=f"{c} filter for a single selection (default: all)")
+    ap.add_argument("--data-dir", type=Path, default=Path(__file__).resolve().parent)
+    ap.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS)
+    args = ap.parse_args(argv)
+
+    fmt = args.format or args.out.suffix.lstrip(".").lower()
+    if fmt not in FORMATS:
+        ap.error(f"can't tell the format from {args.out.name}; pass --format")
+    if fmt == "parquet" and not HAS_ARROW:
+        ap.error("parquet export needs pyarrow")
+    if args.batch:
+        selections = read_selections(args.batch)
+    else:
+        selections = [{c: getattr(args, c) for c in SELECTION_COLS if getattr(args, c)}]
+
+    t0 = time.perf_counter()
+    rows = export(args.play, selections, args.out, fmt, args.data_dir.resolve(), args.chunk_rows)
+    print(f"{args.play}: {len(selections)} selection(s), {rows:,} row(s) in {time.perf_counter() - t0:.1f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Game-level aggregate cube behind the Game Summary page.
+
+One row per (season, game, player) with count_<play> / score_<play> for
+every play type plus the two totals. It is built from the columnar store and
+persisted under `.defense_cache/`; when a game partition changes (CSV re-seed
+or ingest) only that game is re-aggregated, so the page just slices the result.
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from data_store import (
+    CACHE_DIR_NAME,
+    HAS_ARROW,
+    load_table,
+    match_value,
+    partition_keys,
+    read_json,
+    read_parquet,
+    store_games,
+    write_atomic,
+)
+
+CUBE_VERSION = 5
+
+KEY_COLS = ["SeasonKey", "GameKey", "PlayerKey", "DTeamAbbrev"]
+
+# the cube's grain: integer keys only. The defending team (ATTR_COLS) is looked
+# up per key (first non-blank value) instead of being grouped on, so a
+# player-game with a blank team on some rows still lands on one row; names
+# and game labels aren't in the cube at all (see dimensions).
+FACT_KEYS = ["SeasonKey", "GameKey", "PlayerKey"]
+ATTR_COLS = [c for c in KEY_COLS if c not in FACT_KEYS]
+
+# cube suffix -> (file, outcome label col, id col); order is the column order
+# and the precedence for the team
+PLAY_TYPES = {
+    "iso": ("iso_defended_test.csv", "drive_label", "DriveKey"),
+    "bhr_def": ("picks_defended_test.csv", "pick_defense_outcome", "PickKey"),
+    "scr_def": ("scr_defended_test.csv", "drive_label", "DriveKey"),
+    "closeout": ("closeouts_defended_test.csv", "drive_label", "DriveKey"),
+}
+
+# everything the cube reads from the play files (ids + outcome labels)
+LOAD_COLS = KEY_COLS + ["DPlayerKey", "DriveKey", "PickKey", "drive_label", "pick_defense_outcome"]
+
+
+def source_files(data_dir) -> dict[str, Path]:
+    return {suffix: Path(data_dir) / fname for suffix, (fname, _, _) in PLAY_TYPES.items()}
+
+
+def load_play_file(path, games=None) -> pd.DataFrame:
+    df = load_table(path, columns=LOAD_COLS, games=games)
+    # de-dupe columns defensively (prevents "Grouper not 1-dimensional")
+    df = df.loc[:, ~df.columns.duplicated()]
+    # picks file uses DPlayerKey sometimes
+    if "DPlayerKey" in df.columns and "PlayerKey" not in df.columns:
+        df = df.rename(columns={"DPlayerKey": "PlayerKey"})
+    return df
+
+
+def add_score_cols(df: pd.DataFrame, label_col: str) -> pd.DataFrame:
+    x = df[label_col]
+    df = df.copy()
+    df["good"] = match_value(x, "good", lower=True).astype("int64")
+    df["bad"] = match_value(x, "bad", lower=True).astype("int64") * -1
+    return df
+
+
+def agg_game_stat(df: pd.DataFrame, id_col: str) -> pd.DataFrame:
+    agg = (
+        df.groupby(FACT_KEYS, dropna=False, sort=False)
+          .agg(**{
+              id_col: (id_col, "nunique"),
+              "good": ("good", "sum"),
+              "bad": ("bad", "sum"),
+              **{c: (c, "first") for c in ATTR_COLS},
+          })
+          .reset_index()
+    )
+    agg["score"] = agg["good"] + agg["bad"]
+    return agg
+
+
+def cleanup(df: pd.DataFrame, suffix: str, id_col: str) -> pd.DataFrame:
+    out = df.rename(columns={
+        id_col: f"count_{suffix}",
+        "score": f"score_{suffix}",
+    })
+    # only keep what we need
+    keep = KEY_COLS + [f"count_{suffix}", f"score_{suffix}"]
+    return out[keep]
+
+
+def play_part(df: pd.DataFrame, suffix: str) -> pd.DataFrame:
+    # one play type's slice of the cube: KEY_COLS + count_<suffix> + score_<suffix>
+    _, label_col, id_col = PLAY_TYPES[suffix]
+    return cleanup(agg_game_stat(add_score_cols(df, label_col), id_col), suffix, id_col)
+
+
+def merge_parts(parts: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    # one concat + one groupby on the integer keys: each part brings its own
+    # count_/score_ columns (blank elsewhere), attributes come from the first
+    # part that has them
+    value_cols = [f"{kind}_{s}" for s in PLAY_TYPES for kind in ("count", "score")]
+    stacked = pd.concat([parts[s] for s in PLAY_TYPES], ignore_index=True)
+    result = (
+        stacked.groupby(FACT_KEYS, dropna=False, sort=True)
+               .agg({**{c: "sum" for c in value_cols}, **{c: "first" for c in ATTR_COLS}})
+               .reset_index()
+    )
+    result = result[KEY_COLS + value_cols]
+
+    # fill numeric nulls
+    for c in value_cols:
+        result[c] = pd.to_numeric(result[c], errors="coerce").fillna(0).astype(int)
+
+    # totals
+    result["tot_drives_defended"] = sum(result[f"count_{s}"] for s in PLAY_TYPES)
+    result["tot_drives_score"] = sum(result[f"score_{s}"] for s in PLAY_TYPES)
+    return result
+
+
+def _refresh_part(cache: Path, suffix: str, path, seen: dict | None) -> tuple[pd.DataFrame | None, dict, bool, float]:
+    """
+    One play type's cube slice, brought up to date: (part, game hashes,
+    whether it was rewritten, seconds). Only games whose partition hash
+    moved (or that are new) are read and re-aggregated; an unchanged part
+    isn't read at all (part is None).
+    """
+    t0 = time.perf_counter()
+    part_path = cache / f"game_cube_{suffix}.parquet"
+    current = store_games(path)
+    seen = seen if part_path.exists() else None
+    if seen == current:
+        return None, current, False, time.perf_counter() - t0
+
+    seen = seen or {}
+    dirty = [k for k, h in current.items() if seen.get(k) != h]
+    fresh = play_part(load_play_file(path, games=dirty), suffix)
+    if part_path.exists():
+        old = read_parquet(part_path)
+        keep = partition_keys(old).isin(current.keys() - set(dirty))
+        fresh = pd.concat([old[keep.to_numpy()], fresh], ignore_index=True)
+
+    write_atomic(part_path, lambda p: fresh.to_parquet(p, index=False))
+    return fresh, current, True, time.perf_counter() - t0
+
+
+def _per_file(fn, files: dict) -> dict:
+    # the play files are independent: read / normalize / score / aggregate them concurrently
+    # (arrow reads and most of the pandas work release the GIL)
+    with ThreadPoolExecutor(max_workers=len(files)) as pool:
+        futures = {suffix: pool.submit(fn, suffix, path) for suffix, path in files.items()}
+        return {suffix: fut.result() for suffix, fut in futures.items()}
+
+
+def ensure_game_cube(data_dir, timings: dict | None = None) -> pd.DataFrame:
+    """
+    Return the game cube for the play files in `data_dir`, updating the
+    persisted copy first if any game partition changed. The four play
+    files are refreshed in parallel (see _refresh_part); games that left
+    the store are dropped. If `timings` is given it gets seconds per play
+    type plus "merge" and "total".
+    """
+    t0 = time.perf_counter()
+    timings = {} if timings is None else timings
+    files = source_files(data_dir)
+
+    if not HAS_ARROW:  # nowhere to persist it; build in memory
+        def build(suffix, path):
+            t = time.perf_counter()
+            return play_part(load_play_file(path), suffix), time.perf_counter() - t
+
+        built = _per_file(build, files)
+        timings.update({suffix: secs for suffix, (_, secs) in built.items()})
+        t = time.perf_counter()
+        cube = merge_parts({suffix: part for suffix, (part, _) in built.items()})
+        timings["merge"] = time.perf_counter() - t
+        timings["total"] = time.perf_counter() - t0
+        return cube
+
+    cache = Path(data_dir).resolve() / CACHE_DIR_NAME
+    cube_path = cache / "game_cube.parquet"
+    meta_path = cache / "game_cube.json"
+
+    meta = read_json(meta_path)
+    seen_games = meta.get("games", {}) if meta.get("version") == CUBE_VERSION else {}
+
+    refreshed = _per_file(lambda suffix, path: _refresh_part(cache, suffix, path, seen_games.get(suffix)), files)
+    timings.update({suffix: secs for suffix, (_, _, _, secs) in refreshed.items()})
+    changed = not cube_path.exists() or any(rewritten for _, _, rewritten, _ in refreshed.values())
+
+    t = time.perf_counter()
+    if not changed:
+        cube = read_parquet(cube_path)
+    else:
+        parts = {
+            suffix: part if part is not None else read_parquet(cache / f"game_cube_{suffix}.parquet")
+            for suffix, (part, _, _, _) in refreshed.items()
+        }
+        cube = merge_parts(parts)
+        write_atomic(cube_path, lambda p: cube.to_parquet(p, index=False))
+        meta = {"version": CUBE_VERSION, "games": {suffix: current for suffix, (_, current, _, _) in refreshed.items()}}
+        write_atomic(meta_path, lambda p: p.write_text(json.dumps(meta)))
+    timings["merge"] = time.perf_counter() - t
+    timings["total"] = time.perf_counter() - t0
+    return cube
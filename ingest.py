@@ -0,0 +1,41 @@
+"""
+Push new games into the partitioned store without reloading the season.
+
+    python ingest.py scr_def tonight_scr.csv
+    python ingest.py bhr_def tonight_picks.csv --data-dir /srv/defense
+
+Each file holds raw rows for one play type (same columns as the season CSV);
+every (SeasonKey, GameKey) in it replaces that game's partition, then the
+game cube re-aggregates just those games. Running pages pick the change up
+on their next rerun (their caches and indexes, the chance lookup's included,
+are keyed on the store version).
+"""
+import argparse
+from pathlib import Path
+
+from data_store import ingest_games, read_csv_typed
+from game_cube import PLAY_TYPES, ensure_game_cube, source_files
+
+
+def ingest(play: str, paths: list, data_dir) -> list[str]:
+    dataset = source_files(data_dir)[play]
+    written = []
+    for path in paths:
+        written += ingest_games(dataset, read_csv_typed(path))
+    ensure_game_cube(data_dir)
+    return written
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Ingest per-game play files into the defense store.")
+    ap.add_argument("play", choices=list(PLAY_TYPES), help="play type the rows belong to")
+    ap.add_argument("files", nargs="+", type=Path, help="CSV file(s) with that play type's rows")
+    ap.add_argument("--data-dir", type=Path, default=Path(__file__).resolve().parent)
+    args = ap.parse_args(argv)
+
+    written = ingest(args.play, args.files, args.data_dir)
+    print(f"{args.play}: {len(written)} game partition(s) written: {', '.join(written)}")
+
+
+if __name__ == "__main__":
+    main()
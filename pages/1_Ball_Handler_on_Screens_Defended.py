@@ -1,4 +1,4 @@
-from utils_defense import build_app, ensure_global_team_game_sidebar
+from utils_defense import build_app, ensure_global_team_game_sidebar, page_kwargs
 import streamlit as st
 
 
@@ -10,17 +10,8 @@ ensure_global_team_game_sidebar(
     oteam_col="OTeamAbbrev",
 )
 
+# schema / title / count label: queries.PLAY_PAGES["bhr_def"]
 build_app(
-    title="Ball Handler on Screens Defended",
-    data_path="picks_defended_test.csv",
-    game_id_col="GameKey",
-    game_date_col="game_date",
-    oteam_col="OTeamAbbrev",
-    defteam_col="DTeamAbbrev",
-    defender_name_cols=["BallHandlerDefenderName"],
-    outcome_col="pick_defense_outcome",
-    chance_col="chance_id",
-    deftype_col="scr_def_type",
+    **page_kwargs("bhr_def"),
     state_prefix="picks",
-    count_label="picks",
 )
@@ -1,4 +1,4 @@
-from utils_defense import build_app, ensure_global_team_game_sidebar
+from utils_defense import build_app, ensure_global_team_game_sidebar, page_kwargs
 import streamlit as st
 
 
@@ -10,17 +10,8 @@ ensure_global_team_game_sidebar(
     oteam_col="OTeamAbbrev",
 )
 
+# schema / title / count label: queries.PLAY_PAGES["iso"]
 build_app(
-    title="Isos Defended",
-    data_path="iso_defended_test.csv",
-    game_id_col="GameKey",
-    game_date_col="game_date",
-    oteam_col="OTeamAbbrev",
-    defteam_col="DTeamAbbrev",
-    defender_name_cols=["firstName", "lastName"],
-    outcome_col="drive_label",
-    chance_col="chance_id",
-    deftype_col=None,
+    **page_kwargs("iso"),
     state_prefix="isos",
-    count_label="drives",
 )
@@ -0,0 +1,42 @@
+# pages/5_Chance_Lookup.py
+import streamlit as st
+
+from queries import chance_index, chance_plays
+
+st.set_page_config(page_title="Chance Lookup", layout="wide")
+st.title("Chance Lookup")
+
+# one index over the four play files (chance_id, PickKey, DriveKey), built once per file version
+with st.spinner("Indexing chance_ids..."):
+    chance_index()
+
+# ?chance_id=... (the links in the chance_id tables) fills the box; the box keeps the url in step
+K_QUERY = "lookup_query"
+linked = st.query_params.get("chance_id", "")
+if linked and st.session_state.get(f"{K_QUERY}_linked") != linked:
+    st.session_state[f"{K_QUERY}_linked"] = linked
+    st.session_state[K_QUERY] = linked
+
+
+def _sync_url() -> None:
+    value = st.session_state[K_QUERY].strip()
+    st.session_state[f"{K_QUERY}_linked"] = value
+    if value:
+        st.query_params["chance_id"] = value
+    else:
+        st.query_params.pop("chance_id", None)
+
+
+query = st.text_input("chance_id, PickKey or DriveKey", key=K_QUERY, on_change=_sync_url).strip()
+if not query:
+    st.info("Enter a chance_id (or a PickKey / DriveKey) to see every defended action on that chance.")
+    st.stop()
+
+plays = chance_plays(query)
+if plays.empty:
+    st.warning(f"No play in any dataset has chance_id / PickKey / DriveKey **{query}**.")
+    st.stop()
+
+chances = plays["chance_id"].unique()
+st.caption(f"{len(plays):,} defended action(s) on chance {', '.join(map(str, chances))}")
+st.dataframe(plays, use_container_width=True, hide_index=True)
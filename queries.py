@@ -0,0 +1,828 @@
+"""
+Headless queries behind the dashboard pages.
+
+Every function takes a dataset / filter spec and returns frames, so pages
+only render and the same answers can be used from batch jobs and the CLI.
+Queries marked @memoized go through the shared result cache (see
+result_cache), keyed on their arguments plus the data_version of the files
+they read: treat what they return as read-only. No streamlit in here.
+
+A dataset spec is the dict build_app assembles from a page's schema
+(see dataset_spec); filters are plain values / lists, "All ..." meaning
+no filter.
+"""
+import functools
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_store import (
+    build_key_index,
+    build_row_index,
+    cascade_facets,
+    crosstab,
+    data_version,
+    dataset_artifact,
+    dataset_view,
+    distinct_values,
+    filter_mask,
+    key_rows,
+    label_by_group,
+    lookup_rows,
+    match_value,
+    table_exists,
+    take_rows,
+)
+from dimensions import game_dim, game_labels, player_dim, player_filter, player_keys, player_names
+from game_cube import PLAY_TYPES, ensure_game_cube, source_files
+from result_cache import memoized
+
+ALL_TEAMS = "All Teams"
+ALL_GAMES = "All Games"
+ALL = "(All)"
+
+APP_DIR = Path(__file__).resolve().parent
+
+
+# ---- dimensions ----
+
+def _sources(data_dir=None) -> list[dict]:
+    # the play datasets under data_dir that exist, in PLAY_TYPES order (the dimensions' precedence)
+    return [ds for ds in (play_dataset(play, data_dir) for play in PLAY_TYPES) if table_exists(ds["path"])]
+
+
+def dimension_paths(data_dir=None) -> tuple[str, ...]:
+    """
+    Files the player / game dimensions under `data_dir` are built from, for
+    cache keys: every play file, present or not (data_version marks missing
+    ones), so this is string work only.
+    """
+    return _play_paths(None if data_dir is None else str(data_dir))
+
+
+@functools.lru_cache(maxsize=64)
+def _play_paths(data_dir: str | None) -> tuple[str, ...]:
+    return tuple(play_dataset(play, data_dir)["path"] for play in PLAY_TYPES)
+
+
+def players(data_dir=None) -> pd.DataFrame:
+    """Player dimension (see dimensions.player_dim) over the play files under `data_dir`."""
+    return player_dim(tuple(
+        (ds["path"], ds["player_key_col"], tuple(ds["defender_name_cols"]), ds["defteam_col"], ds["game_id_col"])
+        for ds in _sources(data_dir)
+    ))
+
+
+def games(data_dir=None) -> pd.DataFrame:
+    """Game dimension (see dimensions.game_dim) over the play files under `data_dir`."""
+    return game_dim(tuple(
+        (ds["path"], ds["game_id_col"], ds["game_date_col"], ds["defteam_col"], ds["oteam_col"])
+        for ds in _sources(data_dir)
+    ))
+
+
+# page queries read the dataset and the dimensions built next to it
+_dataset_paths = lambda ds, *args, **kwargs: [ds["path"], *dimension_paths(Path(ds["path"]).parent)]
+
+
+# ---- labels / loading ----
+
+def load_master(master_csv_path: str, defteam_col: str, game_id_col: str) -> pd.DataFrame:
+    """
+    Distinct (team, game) rows of the master file with the game's label from
+    that team's side, its neutral label and its ordinal (see
+    dimensions.game_dim); built once per data version, shared read-only.
+    """
+    data_dir = Path(master_csv_path).parent
+
+    def build() -> pd.DataFrame:
+        df = dataset_view(master_csv_path, [defteam_col, game_id_col])
+        pairs = df.drop_duplicates()
+        pairs = pairs[pairs[game_id_col].notna()]
+
+        # team stays categorical (NaN team rows drop out of the team list); ids become widget strings
+        dim = games(data_dir)
+        out = pd.DataFrame({"_Team": pairs[defteam_col], "_GameId": pairs[game_id_col].astype(str)})
+        out["_GameLabel"] = game_labels(dim, pairs[game_id_col], pairs[defteam_col])
+        out["_Label"] = game_labels(dim, pairs[game_id_col])
+        out["_Ordinal"] = dim["ordinal"].reindex(pairs[game_id_col].to_numpy()).fillna(-1).astype("int64").to_numpy()
+        return out.reset_index(drop=True)
+
+    depends = data_version(dimension_paths(data_dir))
+    return dataset_artifact(master_csv_path, ("master", defteam_col, game_id_col), build, depends=depends)
+
+
+def team_games_index(master_csv_path: str, defteam_col: str, game_id_col: str) -> dict:
+    """
+    Everything the global Team / Game sidebar shows, as plain lists / dicts:
+
+        {"teams": [ALL_TEAMS, *teams],
+         "games": {team: [game id, ...]},       newest first; ALL_TEAMS -> [ALL_GAMES, every game]
+         "labels": {team: {game id: label}}}    ALL_TEAMS uses the neutral labels
+
+    Built from load_master once per data version, so a rerun is dict lookups.
+    """
+    data_dir = Path(master_csv_path).parent
+
+    def build() -> dict:
+        master = load_master(master_csv_path, defteam_col, game_id_col)
+        newest = master.sort_values("_Ordinal", ascending=False, kind="mergesort")
+        everyone = newest.drop_duplicates("_GameId")
+        games = {ALL_TEAMS: [ALL_GAMES, *everyone["_GameId"]]}
+        labels = {ALL_TEAMS: {ALL_GAMES: ALL_GAMES, **dict(zip(everyone["_GameId"], everyone["_Label"]))}}
+        for team, g in newest.dropna(subset=["_Team"]).groupby("_Team", observed=True, sort=True):
+            g = g.drop_duplicates("_GameId")
+            games[str(team)] = g["_GameId"].tolist()
+            labels[str(team)] = dict(zip(g["_GameId"], g["_GameLabel"]))
+        return {"teams": [ALL_TEAMS, *sorted(t for t in games if t != ALL_TEAMS)], "games": games, "labels": labels}
+
+    depends = data_version(dimension_paths(data_dir))
+    return dataset_artifact(master_csv_path, ("team_games", defteam_col, game_id_col), build, depends=depends)
+
+
+def display_cols(df: pd.DataFrame, game_id_col: str, defteam_col: str, dim: pd.DataFrame) -> dict:
+    # Game label as a category, looked up from the game dimension once per distinct (game, team)
+    if game_id_col not in df.columns:
+        return {"Game": pd.Series("UNKNOWN", index=df.index)}
+    cols = [c for c in [game_id_col, defteam_col] if c in df.columns]
+    game = label_by_group(
+        df, cols,
+        lambda u: game_labels(dim, u[game_id_col], u[defteam_col] if defteam_col in u.columns else None),
+    )
+    return {"Game": game}
+
+
+def load_page_data(data_path: str, columns: list[str], game_id_col: str, defteam_col: str) -> pd.DataFrame:
+    """
+    Read-only frame of `columns` plus Game from the shared dataset registry:
+    every page and session reuses the same parsed columns and labels.
+    """
+    data_dir = Path(data_path).parent
+
+    def build() -> dict:
+        return display_cols(dataset_view(data_path, [game_id_col, defteam_col]), game_id_col, defteam_col, games(data_dir))
+
+    depends = data_version(dimension_paths(data_dir))
+    extra = dataset_artifact(data_path, ("display", game_id_col, defteam_col), build, depends=depends)
+    return dataset_view(data_path, columns, extra=extra)
+
+
+# ---- team / game filtering ----
+
+def team_game_filters(team_value: str, game_id_value: str, defteam_col: str, game_id_col: str) -> dict:
+    # global selection as lookup_rows filters ("All ..." = no filter)
+    return {
+        defteam_col: [] if team_value == ALL_TEAMS else [str(team_value)],
+        game_id_col: [] if game_id_value == ALL_GAMES else [str(game_id_value)],
+    }
+
+
+def apply_team_game_filter_to_df(
+    df: pd.DataFrame,
+    *,
+    team_value: str,
+    game_id_value: str,
+    defteam_col: str,
+    game_id_col: str,
+    index: dict | None = None,
+):
+    # with a row index (built on this same df) it's two lookups, no scan;
+    # either way one take at the end, and no copy at all for All Teams / All Games
+    if index is not None:
+        rows = lookup_rows(index, len(df), team_game_filters(team_value, game_id_value, defteam_col, game_id_col))
+        return take_rows(df, rows)
+
+    keep = np.ones(len(df), dtype=bool)
+
+    if team_value != ALL_TEAMS and defteam_col in df.columns:
+        keep &= match_value(df[defteam_col], team_value)
+
+    if game_id_value != ALL_GAMES and game_id_col in df.columns:
+        keep &= match_value(df[game_id_col], game_id_value)
+
+    return take_rows(df, keep)
+
+
+# ---- paginated tables ----
+
+PAGE_SIZE = 100  # rows per page of a paginated table
+
+
+def sorted_page(table: pd.DataFrame, sort_by: str | None, descending: bool, page: int, page_size: int = PAGE_SIZE) -> pd.DataFrame:
+    """
+    Rows of `page` (0-based) of `table` after a stable sort on `sort_by`
+    (None / unknown column = table order; blanks last either way). Only the
+    page's rows are taken.
+    """
+    start = max(int(page), 0) * page_size
+    if sort_by not in table.columns:
+        return table.iloc[start:start + page_size]
+    # sort on the rank of each distinct value, so descending stays stable too
+    codes, uniques = pd.factorize(table[sort_by], sort=True)
+    last = len(uniques) - 1
+    rank = np.where(codes < 0, last + 1, last - codes if descending else codes)
+    return table.iloc[np.argsort(rank, kind="stable")[start:start + page_size]]
+
+
+# ---- defended-play pages (build_app) ----
+
+def dataset_spec(
+    *,
+    data_path: str,
+    defteam_col: str,
+    game_id_col: str,
+    game_date_col: str,
+    oteam_col: str,
+    defender_name_cols: list[str],
+    outcome_col: str,
+    chance_col: str,
+    player_key_col: str = "PlayerKey",
+    deftype_col: str | None = None,
+    navtype_col: str | None = None,
+) -> dict:
+    return {
+        "path": data_path,
+        "defteam_col": defteam_col,
+        "game_id_col": game_id_col,
+        "game_date_col": game_date_col,
+        "oteam_col": oteam_col,
+        "defender_name_cols": list(defender_name_cols),
+        "player_key_col": player_key_col,
+        "outcome_col": outcome_col,
+        "chance_col": chance_col,
+        "deftype_col": deftype_col,
+        "navtype_col": navtype_col,
+    }
+
+
+# the four defended-play pages (pages/1-4), keyed like game_cube.PLAY_TYPES:
+# title, summary count label and the dataset_spec kwargs
+PLAY_PAGES = {
+    "bhr_def": {
+        "title": "Ball Handler on Screens Defended",
+        "count_label": "picks",
+        "schema": dict(
+            data_path="picks_defended_test.csv",
+            game_id_col="GameKey",
+            game_date_col="game_date",
+            oteam_col="OTeamAbbrev",
+            defteam_col="DTeamAbbrev",
+            defender_name_cols=["BallHandlerDefenderName"],
+            player_key_col="DPlayerKey",
+            outcome_col="pick_defense_outcome",
+            chance_col="chance_id",
+            deftype_col="scr_def_type",
+        ),
+    },
+    "iso": {
+        "title": "Isos Defended",
+        "count_label": "drives",
+        "schema": dict(
+            data_path="iso_defended_test.csv",
+            game_id_col="GameKey",
+            game_date_col="game_date",
+            oteam_col="OTeamAbbrev",
+            defteam_col="DTeamAbbrev",
+            defender_name_cols=["firstName", "lastName"],
+            player_key_col="PlayerKey",
+            outcome_col="drive_label",
+            chance_col="chance_id",
+            deftype_col=None,
+        ),
+    },
+    "closeout": {
+        "title": "Closeouts Defended",
+        "count_label": "drives",
+        "schema": dict(
+            data_path="closeouts_defended_test.csv",
+            game_id_col="GameKey",
+            game_date_col="game_date",
+            oteam_col="OTeamAbbrev",
+            defteam_col="DTeamAbbrev",
+            defender_name_cols=["firstName", "lastName"],
+            player_key_col="PlayerKey",
+            outcome_col="drive_label",
+            chance_col="chance_id",
+            deftype_col=None,
+        ),
+    },
+    "scr_def": {
+        "title": "Screen Switch Defended",
+        "count_label": "drives",
+        "schema": dict(
+            data_path="scr_defended_test.csv",
+            game_id_col="GameKey",
+            game_date_col="game_date",
+            oteam_col="OTeamAbbrev",
+            defteam_col="DTeamAbbrev",
+            defender_name_cols=["firstName", "lastName"],
+            player_key_col="PlayerKey",
+            outcome_col="drive_label",
+            chance_col="chance_id",
+            deftype_col=None,
+        ),
+    },
+}
+
+
+def play_dataset(play: str, data_dir=None) -> dict:
+    """dataset_spec for one of PLAY_PAGES, with its file under `data_dir` (default: relative path)."""
+    schema = dict(PLAY_PAGES[play]["schema"])
+    if data_dir is not None:
+        schema["data_path"] = str(Path(data_dir) / schema["data_path"])
+    return dataset_spec(**schema)
+
+
+def page_frame(ds: dict) -> pd.DataFrame:
+    # only the columns the page reads (defender and game as keys); the physics metrics stay on disk
+    cols = [
+        ds["defteam_col"], ds["game_id_col"], ds["player_key_col"],
+        ds["outcome_col"], ds["chance_col"], ds["deftype_col"], ds["navtype_col"],
+    ]
+    return load_page_data(ds["path"], [c for c in cols if c], ds["game_id_col"], ds["defteam_col"])
+
+
+def _players(ds: dict) -> pd.DataFrame:
+    # the dimension over the dataset's directory, so every page resolves a key to the same name
+    return players(Path(ds["path"]).parent)
+
+
+def _row_index(ds: dict, data: pd.DataFrame) -> dict:
+    # row positions per team / game / defender / type / outcome, built once per dataset version
+    index_cols = tuple(
+        c for c in [ds["defteam_col"], ds["game_id_col"], ds["player_key_col"], ds["deftype_col"], ds["navtype_col"], ds["outcome_col"]]
+        if c in data.columns
+    )
+    return dataset_artifact(
+        ds["path"],
+        ("row_index", index_cols),
+        lambda: build_row_index(data, list(index_cols)),
+    )
+
+
+def team_game_frame(ds: dict, team: str, game_id: str) -> pd.DataFrame:
+    data = page_frame(ds)
+    return apply_team_game_filter_to_df(
+        data,
+        team_value=team,
+        game_id_value=game_id,
+        defteam_col=ds["defteam_col"],
+        game_id_col=ds["game_id_col"],
+        index=_row_index(ds, data),
+    )
+
+
+def _type_cols(ds: dict, df: pd.DataFrame) -> tuple[str | None, str | None]:
+    # Def / Nav type filters only where the dataset has those columns
+    deftype = ds["deftype_col"] if ds["deftype_col"] and ds["deftype_col"] in df.columns else None
+    navtype = ds["navtype_col"] if ds["navtype_col"] and ds["navtype_col"] in df.columns else None
+    return deftype, navtype
+
+
+@memoized(_dataset_paths, unordered=("defenders",))
+def facet_options(ds: dict, team: str, game_id: str, defenders=()) -> dict[str, list]:
+    """
+    Sidebar options {col: values} for the Def / Nav Type columns the
+    dataset has and "Defender". Def/Nav Type options follow the Defender
+    selection, Defender options follow only team/game (it's shared across pages).
+    """
+    df = team_game_frame(ds, team, game_id)
+    key_col, dim = ds["player_key_col"], _players(ds)
+    type_cols = [c for c in _type_cols(ds, df) if c]
+    facets = cascade_facets(df, {key_col: player_filter(dim, defenders)}, type_cols + [key_col])
+    options = {c: facets[c].index.tolist() for c in type_cols}
+    options["Defender"] = sorted(player_names(dim, facets[key_col].index.astype("int64")))
+    return options
+
+
+def summary_pivot(
+    f: pd.DataFrame,
+    key_col: str,
+    outcome_col: str,
+    count_label: str,
+    dim: pd.DataFrame,
+    *,
+    outcomes=None,
+    pct: bool = False,
+    name_col: str = "Defender",
+) -> pd.DataFrame:
+    """
+    Defender summary from one crosstab pass over (key, outcome) codes: one row
+    per defender key (named from `dim`, sorted by name) with `count_label`
+    (the total over the outcome columns), a count per outcome (`outcomes` in
+    that order, 0 where unseen; default every outcome seen, sorted) and, with
+    `pct`, each outcome's "<outcome>_pct" share of the total.
+    """
+    counts, keys, labels = crosstab(f[key_col], f[outcome_col])
+    if outcomes is not None:
+        pos = {lab: i for i, lab in enumerate(labels)}
+        picked = np.zeros((len(keys), len(outcomes)), dtype=counts.dtype)
+        for j, lab in enumerate(outcomes):
+            if lab in pos:
+                picked[:, j] = counts[:, pos[lab]]
+        counts, labels = picked, list(outcomes)
+
+    names = player_names(dim, keys)
+    order = np.argsort(names, kind="stable")
+    counts, total = counts[order], counts[order].sum(axis=1)
+    out = {name_col: names[order], count_label: total}
+    out.update({lab: counts[:, j] for j, lab in enumerate(labels)})
+    if pct:
+        share = np.divide(counts, total[:, None], out=np.zeros(counts.shape), where=total[:, None] > 0)
+        out.update({f"{lab}_pct": share[:, j] for j, lab in enumerate(labels)})
+    return pd.DataFrame(out)
+
+
+@memoized(_dataset_paths, unordered=("defenders", "deftypes", "navtypes"))
+def defender_summary(
+    ds: dict,
+    team: str,
+    game_id: str,
+    defenders=(),
+    deftypes=(),
+    navtypes=(),
+    count_label: str = "picks",
+) -> tuple[pd.DataFrame, int]:
+    """Defender x outcome counts after every filter, and the number of rows they kept."""
+    df = team_game_frame(ds, team, game_id)
+    deftype_col, navtype_col = _type_cols(ds, df)
+    key_col, dim = ds["player_key_col"], _players(ds)
+
+    filters = {key_col: player_filter(dim, defenders)}
+    if deftype_col:
+        filters[deftype_col] = list(deftypes)
+    if navtype_col:
+        filters[navtype_col] = list(navtypes)
+
+    # only the two summary columns are materialized (and only if a filter drops rows)
+    f = take_rows(df, filter_mask(df, filters), [key_col, ds["outcome_col"]])
+    return summary_pivot(f, key_col, ds["outcome_col"], count_label, dim), len(f)
+
+
+@memoized(_dataset_paths)
+def chance_options(ds: dict, team: str, game_id: str) -> dict[str, list]:
+    """Player / Outcome / Def Type choices for the chance_id table ("(All)" first)."""
+    base = team_game_frame(ds, team, game_id)
+    outcome_col, deftype_col = ds["outcome_col"], _type_cols(ds, base)[0]
+
+    if outcome_col in base.columns:
+        outcomes_raw = distinct_values(base[outcome_col])
+        lowers = {x.lower() for x in outcomes_raw}
+        if {"good", "neutral", "bad"}.issubset(lowers):
+            outcomes = ["good", "neutral", "bad"]
+        else:
+            outcomes = sorted(outcomes_raw)
+    else:
+        outcomes = []
+
+    return {
+        "player": [ALL] + sorted(player_names(_players(ds), base[ds["player_key_col"]].dropna().unique())),
+        "outcome": [ALL] + outcomes,
+        "deftype": [ALL] + (distinct_values(base[deftype_col]) if deftype_col else []),
+    }
+
+
+@memoized(_dataset_paths)
+def chance_ids(ds: dict, team: str, game_id: str, player: str = ALL, outcome: str = ALL, deftype: str = ALL) -> pd.DataFrame:
+    """
+    Player / Outcome / Def Type / chance_id rows of the team+game selection
+    (not the sidebar filters, so the list doesn't disappear because of them).
+    """
+    base = team_game_frame(ds, team, game_id)
+    outcome_col, chance_col, deftype_col = ds["outcome_col"], ds["chance_col"], _type_cols(ds, base)[0]
+    key_col, dim = ds["player_key_col"], _players(ds)
+
+    # filters AND into one mask over base; rows are taken once, for the shown columns only
+    keep = np.ones(len(base), dtype=bool)
+    if player != ALL:
+        keep &= np.isin(base[key_col].to_numpy(), player_keys(dim, [player]))
+    if outcome != ALL and outcome_col in base.columns:
+        keep &= match_value(base[outcome_col], outcome, lower=outcome in ["good", "neutral", "bad"])
+    if deftype_col and deftype != ALL:
+        keep &= match_value(base[deftype_col], deftype)
+
+    show = {key_col: "Player"}
+    if outcome_col in base.columns:
+        show[outcome_col] = "Outcome"
+    if deftype_col:
+        show[deftype_col] = "Def Type"
+    show[chance_col] = "chance_id"
+
+    table = take_rows(base, keep, show)
+    table["Player"] = player_names(dim, table["Player"])
+    # Clean
+    for c in table.columns:
+        table[c] = table[c].astype(str).str.strip()
+
+    table = table.dropna(subset=["chance_id"])
+    return table[table["chance_id"].ne("")]
+
+
+@memoized(_dataset_paths)
+def chance_ids_page(
+    ds: dict,
+    team: str,
+    game_id: str,
+    player: str = ALL,
+    outcome: str = ALL,
+    deftype: str = ALL,
+    *,
+    sort_by: str | None = None,
+    descending: bool = False,
+    page: int = 0,
+    page_size: int = PAGE_SIZE,
+) -> tuple[pd.DataFrame, int, int]:
+    """One sorted page of chance_ids(), its total rows and distinct chance_ids."""
+    table = chance_ids(ds, team, game_id, player, outcome, deftype)
+    return sorted_page(table, sort_by, descending, page, page_size), len(table), table["chance_id"].nunique()
+
+
+# ---- bulk export ----
+
+EXPORT_CHUNK_ROWS = 50_000  # rows materialized at a time by export_rows
+PLAY_KEY_COLS = ["PickKey", "DriveKey"]  # whichever the dataset has identifies the play
+
+
+def export_rows(ds: dict, selections, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """
+    Yield (selection number, frame) for every selection in `selections`,
+    each a dict of team / game / defender / outcome / deftype (missing or
+    "All ..." = no filter): Team, GameKey, Game, Player, Outcome, Def Type,
+    the play key (PickKey / DriveKey) and chance_id of the matching rows
+    that have a chance_id, at most `chunk_rows` rows per frame. Rows are
+    found through the row index and taken one chunk at a time from the
+    shared dataset, so nothing is materialized whole. Every selection
+    yields at least one (possibly empty) frame.
+    """
+    data = page_frame(ds)
+    index, dim = _row_index(ds, data), _players(ds)
+    key_col, outcome_col = ds["player_key_col"], ds["outcome_col"]
+    deftype_col = _type_cols(ds, data)[0]
+    source, show = _play_source(ds, data)
+
+    for i, sel in enumerate(selections):
+        filters = team_game_filters(sel.get("team", ALL_TEAMS), sel.get("game", ALL_GAMES), ds["defteam_col"], ds["game_id_col"])
+        defender = sel.get("defender", ALL)
+        if defender not in (None, "", ALL):
+            filters[key_col] = [str(k) for k in player_filter(dim, [defender])]
+        rows = lookup_rows(index, len(data), filters)
+        # label filters on the selected rows only (outcome case-insensitive, like chance_ids)
+        for col, value, lower in ((outcome_col, sel.get("outcome", ALL), True), (deftype_col, sel.get("deftype", ALL), False)):
+            if col in data.columns and value not in (None, "", ALL):
+                rows = rows[match_value(data[col].take(rows), value, lower=lower)]
+
+        for start in range(0, max(len(rows), 1), chunk_rows):
+            yield i, _play_rows(source, rows[start:start + chunk_rows], show, dim)
+
+
+def _play_source(ds: dict, data: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
+    # page columns plus the play key, and the {column: output name} of a play row
+    play_key = next(iter(dataset_view(ds["path"], PLAY_KEY_COLS).columns), None)
+    source = dataset_view(ds["path"], [play_key], extra=dict(data.items())) if play_key else data
+    deftype_col = _type_cols(ds, data)[0]
+
+    show = {ds["defteam_col"]: "Team", ds["game_id_col"]: "GameKey", "Game": "Game", ds["player_key_col"]: "Player"}
+    if ds["outcome_col"] in data.columns:
+        show[ds["outcome_col"]] = "Outcome"
+    if deftype_col:
+        show[deftype_col] = "Def Type"
+    if play_key:
+        show[play_key] = play_key
+    show[ds["chance_col"]] = "chance_id"
+    return source, {c: name for c, name in show.items() if c in source.columns}
+
+
+def _play_rows(source: pd.DataFrame, rows, show: dict, dim: pd.DataFrame) -> pd.DataFrame:
+    # the rows as plain values (names, not keys), those without a chance_id dropped
+    chunk = take_rows(source, rows, show)
+    chunk["Player"] = player_names(dim, chunk["Player"])
+    for c in ("Team", "Game", "Outcome", "Def Type"):
+        if c in chunk.columns:
+            chunk[c] = chunk[c].astype(object)
+    ids = chunk["chance_id"].astype(str).str.strip()
+    return chunk[chunk["chance_id"].notna().to_numpy() & ids.ne("").to_numpy()].reset_index(drop=True)
+
+
+# ---- chance lookup ----
+
+LOOKUP_COLS = ["Play", "Team", "GameKey", "Game", "Player", "Outcome", "Def Type", *PLAY_KEY_COLS, "chance_id"]
+
+
+def _key_index(ds: dict, col: str) -> tuple:
+    # hash index of one key column, built once per dataset version
+    return dataset_artifact(ds["path"], ("key_index", col), lambda: build_key_index(dataset_view(ds["path"], [col])[col]))
+
+
+def chance_index(data_dir=None) -> dict[str, dict]:
+    """
+    Cross-dataset key index: {play: (dataset spec, {column: key index})} for
+    the chance_id and play key (PickKey / DriveKey) columns of every play
+    file under `data_dir`. Each index lives in its file's registry entry, so
+    it is built on first use and rebuilt (for that file only) once ingestion
+    changes the file.
+    """
+    out = {}
+    for play in PLAY_TYPES:
+        ds = play_dataset(play, data_dir)
+        if table_exists(ds["path"]):
+            cols = dataset_view(ds["path"], [ds["chance_col"], *PLAY_KEY_COLS]).columns
+            out[play] = (ds, {c: _key_index(ds, c) for c in cols})
+    return out
+
+
+def _key_value(values: pd.Index, query: str):
+    # search text as the index's type: play keys are integers
+    if values.dtype.kind in "iu":
+        return int(query) if query.isdigit() else None
+    return query
+
+
+def find_chances(query: str, data_dir=None) -> list[str]:
+    """chance_ids `query` names: itself if a play file has it, else the chance of the play with that PickKey / DriveKey."""
+    query, found = str(query).strip(), {}
+    for ds, keys in chance_index(data_dir).values():
+        for col, index in keys.items():
+            value = _key_value(index[0], query)
+            rows = key_rows(index, value) if value is not None else []
+            if not len(rows):
+                continue
+            if col == ds["chance_col"]:
+                found[query] = None
+            else:
+                found.update(dict.fromkeys(dataset_view(ds["path"], [ds["chance_col"]])[ds["chance_col"]].take(rows).dropna().astype(str)))
+    return list(found)
+
+
+@memoized(lambda query, data_dir=None: dimension_paths(data_dir))
+def chance_plays(query: str, data_dir=None) -> pd.DataFrame:
+    """
+    Every defended action on the chance `query` names (a chance_id, PickKey
+    or DriveKey) across the play files, in one call: LOOKUP_COLS, one row
+    per play. Rows come straight from the key indexes, so the cost depends
+    on the matches, not on the size of the season.
+    """
+    chances = find_chances(query, data_dir)
+    frames = []
+    for play, (ds, keys) in chance_index(data_dir).items():
+        hits = [key_rows(keys[ds["chance_col"]], c) for c in chances]
+        rows = np.unique(np.concatenate(hits)) if hits else []
+        if not len(rows):
+            continue
+        source, show = _play_source(ds, page_frame(ds))
+        frame = _play_rows(source, rows, show, _players(ds))
+        frame.insert(0, "Play", PLAY_PAGES[play]["title"])
+        for c in PLAY_KEY_COLS:
+            if c in frame.columns:
+                frame[c] = frame[c].astype("Int64")  # stays integer next to the other files' blanks
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=LOOKUP_COLS)
+    out = pd.concat(frames, ignore_index=True)
+    return out.reindex(columns=[c for c in LOOKUP_COLS if c in out.columns])
+
+
+# ---- Game Summary page ----
+
+GAME_SUMMARY_COLS = [
+    "Defender",
+    "Game",
+    "tot_drives_defended",
+    "tot_drives_score",
+    "count_bhr_def",
+    "count_scr_def",
+    "count_iso",
+    "count_closeout",
+    "score_bhr_def",
+    "score_scr_def",
+    "score_iso",
+    "score_closeout",
+]
+
+
+@memoized(lambda data_dir=APP_DIR: source_files(data_dir).values())
+def game_cube(data_dir=APP_DIR) -> pd.DataFrame:
+    # persisted cube, refreshed for changed games only (see ensure_game_cube)
+    return ensure_game_cube(data_dir)
+
+
+@memoized(lambda team, game_id, data_dir=APP_DIR: source_files(data_dir).values())
+def game_summary(team: str, game_id: str, data_dir=APP_DIR) -> pd.DataFrame:
+    """Game cube rows for the selection, busiest defenders first."""
+    f = game_cube(data_dir)
+
+    if team != ALL_TEAMS and "DTeamAbbrev" in f.columns:
+        f = f[match_value(f["DTeamAbbrev"], str(team).strip())]
+
+    if game_id != ALL_GAMES:
+        f = f[f["GameKey"].astype("Int64") == int(game_id)]
+
+    f = f.assign(
+        Defender=player_names(players(data_dir), f["PlayerKey"]),
+        Game=game_labels(games(data_dir), f["GameKey"], f["DTeamAbbrev"]),
+    )
+    out = f[GAME_SUMMARY_COLS]
+    return out.sort_values(["tot_drives_defended", "tot_drives_score"], ascending=[False, False], kind="mergesort")
+
+
+# ---- picks explorer (pick_app) ----
+
+PICKS_PATH = "picks_defended_test.csv"
+
+PICK_GAME = "Game"
+PICK_DEFENDER = "BallHandlerDefenderName"
+PICK_PLAYER_KEY = "DPlayerKey"
+PICK_DEFTEAM = "DTeamAbbrev"
+PICK_DEFTYPE = "scr_def_type"
+PICK_OUTCOME = "pick_defense_outcome"
+PICK_CHANCE = "chance_id"
+
+# columns the explorer reads (Game comes from the game dimension; the defender
+# is its key, PICK_DEFENDER filters / columns show the player dimension's names)
+PICK_LOAD_COLS = [PICK_PLAYER_KEY, PICK_DEFTEAM, PICK_DEFTYPE, PICK_OUTCOME, PICK_CHANCE, "PickKey", "GameKey"]
+
+_pick_paths = lambda filters, *args, path=PICKS_PATH, **kwargs: [path, *dimension_paths(Path(path).parent)]
+
+
+def load_picks(path: str = PICKS_PATH) -> pd.DataFrame:
+    # read-only view over the shared dataset registry (one parse per process);
+    # Game is the game dimension's label, looked up once per distinct (game, team)
+    data_dir = Path(path).parent
+
+    def build() -> dict:
+        df = dataset_view(path, ["GameKey", PICK_DEFTEAM])
+        return display_cols(df, "GameKey", PICK_DEFTEAM, games(data_dir))
+
+    depends = data_version(dimension_paths(data_dir))
+    return dataset_view(path, PICK_LOAD_COLS, extra=dataset_artifact(path, ("pick_app_game",), build, depends=depends))
+
+
+def _pick_filters(filters: dict, dim: pd.DataFrame) -> dict:
+    # the Defender selection (names) runs on the key column
+    out = {c: v for c, v in filters.items() if c != PICK_DEFENDER}
+    out[PICK_PLAYER_KEY] = player_filter(dim, filters.get(PICK_DEFENDER) or [])
+    return out
+
+
+@memoized(_pick_paths, unordered=("filters",))
+def pick_options(filters: dict, *, path: str = PICKS_PATH) -> dict[str, list]:
+    """
+    Options for every filter col given all OTHER filters applied, from a
+    single cascading pass; games newest first.
+    """
+    dim = players(Path(path).parent)
+    key_filters = _pick_filters(filters, dim)
+    facets = cascade_facets(load_picks(path), key_filters, list(key_filters))
+    out = {c: (s.index[::-1] if c == PICK_GAME else s.index).tolist() for c, s in facets.items() if c != PICK_PLAYER_KEY}
+    out[PICK_DEFENDER] = sorted(player_names(dim, facets[PICK_PLAYER_KEY].index.astype("int64")))
+    return out
+
+
+def make_summary(df: pd.DataFrame, dim: pd.DataFrame) -> pd.DataFrame:
+    # good / neutral / bad counts and shares per defender, busiest first
+    piv = summary_pivot(
+        df, PICK_PLAYER_KEY, PICK_OUTCOME, "picks", dim,
+        outcomes=["good", "neutral", "bad"], pct=True, name_col="defender",
+    )
+    return piv.sort_values(["picks", "good"], ascending=False, kind="mergesort", ignore_index=True)
+
+
+@memoized(_pick_paths, unordered=("filters",))
+def pick_summary(filters: dict, *, path: str = PICKS_PATH) -> tuple[pd.DataFrame, int]:
+    """Per-defender pick summary after the filters, and the number of rows they kept."""
+    df, dim = load_picks(path), players(Path(path).parent)
+    f = take_rows(df, filter_mask(df, _pick_filters(filters, dim)), [PICK_PLAYER_KEY, PICK_OUTCOME])
+    return make_summary(f, dim), len(f)
+
+
+@memoized(_pick_paths, unordered=("filters",))
+def pick_drilldown(filters: dict, defender: str | None, outcome: str, *, path: str = PICKS_PATH) -> pd.DataFrame:
+    """Distinct plays behind one outcome (optionally one defender) after the filters."""
+    df, dim = load_picks(path), players(Path(path).parent)
+    keep = filter_mask(df, _pick_filters(filters, dim)) & (df[PICK_OUTCOME] == outcome).to_numpy()
+    if defender is not None:
+        keep &= np.isin(df[PICK_PLAYER_KEY].to_numpy(), player_keys(dim, [defender]))
+
+    show_cols = {c: c for c in [PICK_GAME, PICK_DEFTEAM, PICK_DEFTYPE, PICK_PLAYER_KEY, PICK_OUTCOME, PICK_CHANCE, "PickKey", "GameKey"]
+                 if c in df.columns}
+    show_cols[PICK_PLAYER_KEY] = PICK_DEFENDER
+    out = take_rows(df, keep, show_cols)
+    out[PICK_DEFENDER] = player_names(dim, out[PICK_DEFENDER])
+    return out.drop_duplicates()
+
+
+@memoized(_pick_paths, unordered=("filters",))
+def pick_drilldown_page(
+    filters: dict,
+    defender: str | None,
+    outcome: str,
+    *,
+    sort_by: str | None = None,
+    descending: bool = False,
+    page: int = 0,
+    page_size: int = PAGE_SIZE,
+    path: str = PICKS_PATH,
+) -> tuple[pd.DataFrame, int, int]:
+    """One sorted page of pick_drilldown(), its total rows and distinct chance_ids."""
+    table = pick_drilldown(filters, defender, outcome, path=path)
+    return sorted_page(table, sort_by, descending, page, page_size), len(table), table[PICK_CHANCE].nunique()
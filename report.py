@@ -0,0 +1,140 @@
+"""
+Precompute the defender reports for every team and game.
+
+    python report.py --out reports/
+    python report.py --out reports/ --teams OKC HOU --formats csv html --workers 8
+
+For each (team, game) the bundle under <out>/<team>/<GameKey>/ holds, per
+play type (game_cube.PLAY_TYPES), the page's Defender Summary and chance_id
+list (the same queries build_app renders) plus the Game Summary slice,
+written as Parquet and/or CSV, and an index.html with all of them. Teams
+are spread across a process pool; the columnar store, its memory-mapped
+columns and the game cube are brought up to date once before the workers
+start.
+"""
+import argparse
+import html
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from data_store import load_mapped, table_exists
+from game_cube import PLAY_TYPES, ensure_game_cube
+from queries import PLAY_PAGES, chance_ids, defender_summary, game_summary, page_frame, play_dataset
+
+FORMATS = ("parquet", "csv", "html")
+
+
+def team_games(data_dir) -> dict[str, dict[str, str]]:
+    """{team: {game id: game label}} over every play file, newest game first."""
+    frames = []
+    for play in PLAY_TYPES:
+        ds = play_dataset(play, data_dir)
+        if not table_exists(ds["path"]):
+            continue
+        df = page_frame(ds)
+        frames.append(pd.DataFrame({
+            "team": df[ds["defteam_col"]].astype(object),
+            "game": df[ds["game_id_col"]].astype(str),
+            "label": df["Game"].astype(str),
+        }).dropna(subset=["team"]).drop_duplicates())
+    if not frames:
+        return {}
+    pairs = pd.concat(frames).drop_duplicates(["team", "game"])
+    pairs = pairs.sort_values(["team", "label"], ascending=[True, False], kind="mergesort")
+    return {str(team): dict(zip(g["game"], g["label"])) for team, g in pairs.groupby("team", sort=True)}
+
+
+def game_tables(data_dir, team: str, game_id: str) -> dict[str, pd.DataFrame]:
+    # one game's report: the Game Summary slice + per play type summary / chance_ids
+    tables = {"game_summary": game_summary(team, game_id, Path(data_dir))}
+    for play in PLAY_TYPES:
+        ds = play_dataset(play, data_dir)
+        if not table_exists(ds["path"]):
+            continue
+        summary, n_rows = defender_summary(ds, team, game_id, count_label=PLAY_PAGES[play]["count_label"])
+        if n_rows == 0:
+            continue
+        tables[f"{play}_summary"] = summary
+        tables[f"{play}_chance_ids"] = chance_ids(ds, team, game_id)
+    return tables
+
+
+def _html_page(title: str, tables: dict[str, pd.DataFrame]) -> str:
+    body = "".join(
+        f"<h2>{html.escape(name)}</h2>\n{df.to_html(index=False, border=0)}\n" for name, df in tables.items()
+    )
+    return (
+        f"<!doctype html>\n<html><head><meta charset='utf-8'><title>{html.escape(title)}</title></head>"
+        f"<body>\n<h1>{html.escape(title)}</h1>\n{body}</body></html>\n"
+    )
+
+
+def write_bundle(out_dir: Path, title: str, tables: dict[str, pd.DataFrame], formats) -> int:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = 0
+    for name, df in tables.items():
+        if "parquet" in formats:
+            df.to_parquet(out_dir / f"{name}.parquet", index=False)
+            written += 1
+        if "csv" in formats:
+            df.to_csv(out_dir / f"{name}.csv", index=False)
+            written += 1
+    if "html" in formats:
+        (out_dir / "index.html").write_text(_html_page(title, tables), encoding="utf-8")
+        written += 1
+    return written
+
+
+def report_team(data_dir, out_dir, team: str, games: dict[str, str], formats) -> tuple[str, int, int]:
+    """Every game bundle of one team (one pool task); returns (team, games, files written)."""
+    files = 0
+    for game_id, label in games.items():
+        tables = game_tables(data_dir, team, game_id)
+        files += write_bundle(Path(out_dir) / team / game_id, f"{team} - {label}", tables, formats)
+    return team, len(games), files
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Write defender reports for every (team, game, play type).")
+    ap.add_argument("--out", type=Path, required=True, help="output directory")
+    ap.add_argument("--data-dir", type=Path, default=Path(__file__).resolve().parent)
+    ap.add_argument("--teams", nargs="+", help="only these teams (default: all)")
+    ap.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    ap.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    data_dir = args.data_dir.resolve()
+    # bring the shared on-disk caches up to date here, not in every worker at once;
+    # the workers then just map the exported columns
+    for play in PLAY_TYPES:
+        path = play_dataset(play, data_dir)["path"]
+        if table_exists(path):
+            load_mapped(path)
+    ensure_game_cube(data_dir)
+
+    schedule = team_games(data_dir)
+    if args.teams:
+        schedule = {t: g for t, g in schedule.items() if t in set(args.teams)}
+
+    # largest teams first so the pool doesn't finish on a straggler
+    order = sorted(schedule, key=lambda t: -len(schedule[t]))
+    n_games = n_files = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = [pool.submit(report_team, data_dir, args.out, t, schedule[t], tuple(args.formats)) for t in order]
+        for fut in as_completed(futures):
+            team, games, files = fut.result()
+            n_games += games
+            n_files += files
+            print(f"{team}: {games} game(s), {files} file(s)", file=sys.stderr)
+
+    print(f"{len(schedule)} team(s), {n_games} game report(s), {n_files} file(s) in {time.perf_counter() - t0:.1f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
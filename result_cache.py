@@ -0,0 +1,175 @@
+"""
+Process-wide cache for query results, shared by every session.
+
+Entries are keyed by query, the data_version of the files the query reads
+and its (normalized) arguments, and held within a memory budget: least
+recently used entries go first, entries older than the TTL (if one is set)
+are recomputed, and once a file's version moves every entry computed from
+an older version of it is dropped. Concurrent misses on the same key wait
+for a single computation. No streamlit in here.
+
+    DEFENSE_RESULT_CACHE_MB   memory budget (default 256)
+    DEFENSE_RESULT_CACHE_TTL  seconds an entry stays valid (default: no TTL)
+"""
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from data_store import data_version
+
+BUDGET_BYTES = int(float(os.environ.get("DEFENSE_RESULT_CACHE_MB", 256)) * 2**20)
+TTL_SECONDS = float(os.environ["DEFENSE_RESULT_CACHE_TTL"]) if os.environ.get("DEFENSE_RESULT_CACHE_TTL") else None
+
+_entries: OrderedDict = OrderedDict()  # key -> (result, nbytes, created)
+_versions: dict = {}  # (query, paths) -> version the live entries were computed from
+_pending: dict = {}  # key -> lock held while one caller computes it
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidated": 0, "uncacheable": 0}
+_bytes = 0
+
+
+def _freeze(value, unordered: bool = False):
+    # hashable stand-in for an argument; `unordered` lists (filter selections) key as sets
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v, unordered)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = tuple(_freeze(v) for v in value)
+        return tuple(sorted(set(items), key=repr)) if unordered or isinstance(value, (set, frozenset)) else items
+    return value
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_nbytes(k) + _nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def _drop(key) -> None:
+    global _bytes
+    _, nbytes, _ = _entries.pop(key)
+    _bytes -= nbytes
+
+
+def _invalidate(query: str, paths: tuple, version: str) -> None:
+    # first call at a new version: everything computed from the old one is dead
+    if _versions.get((query, paths), version) != version:
+        stale = [k for k in _entries if k[0] == query and k[1] == paths and k[2] != version]
+        for k in stale:
+            _drop(k)
+        _stats["invalidated"] += len(stale)
+    _versions[(query, paths)] = version
+
+
+def _lookup(key):
+    entry = _entries.get(key)
+    if entry is None:
+        return None
+    if TTL_SECONDS is not None and time.monotonic() - entry[2] > TTL_SECONDS:
+        _drop(key)
+        _stats["expired"] += 1
+        return None
+    _entries.move_to_end(key)
+    _stats["hits"] += 1
+    return entry
+
+
+def _store(key, result) -> None:
+    global _bytes
+    nbytes = _nbytes(result)
+    if nbytes > BUDGET_BYTES:
+        _stats["uncacheable"] += 1
+        return
+    if key in _entries:
+        _drop(key)
+    _entries[key] = (result, nbytes, time.monotonic())
+    _bytes += nbytes
+    while _bytes > BUDGET_BYTES:
+        _drop(next(iter(_entries)))
+        _stats["evictions"] += 1
+
+
+def memoized(paths_of, unordered=()):
+    """
+    Cache a query's results on its arguments and the data_version of the
+    files `paths_of(*args, **kwargs)` names. Arguments named in `unordered`
+    are selections whose order doesn't matter ([a, b] hits [b, a]).
+    Results are shared across sessions: callers must not mutate them.
+    """
+    def wrap(fn):
+        sig = inspect.signature(fn)
+        query = fn.__qualname__
+
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            paths = tuple(str(p) for p in paths_of(*args, **kwargs))
+            version = data_version(paths)
+            key = (query, paths, version, tuple(
+                (name, _freeze(value, name in unordered)) for name, value in bound.arguments.items()
+            ))
+
+            with _lock:
+                _invalidate(query, paths, version)
+                entry = _lookup(key)
+                if entry is not None:
+                    return entry[0]
+                pending = _pending.setdefault(key, threading.Lock())
+
+            with pending:  # one computation per key; later callers wait and take its result
+                with _lock:
+                    entry = _lookup(key)
+                    if entry is not None:
+                        return entry[0]
+                    _stats["misses"] += 1
+                try:
+                    result = fn(*args, **kwargs)
+                    with _lock:
+                        _store(key, result)
+                finally:
+                    with _lock:
+                        _pending.pop(key, None)
+            return result
+
+        return call
+    return wrap
+
+
+def cache_stats() -> dict:
+    """Counters since start (or the last clear_cache) plus current size / budget."""
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "hit_rate": _stats["hits"] / lookups if lookups else 0.0,
+            "entries": len(_entries),
+            "bytes": _bytes,
+            "budget_bytes": BUDGET_BYTES,
+            "ttl_seconds": TTL_SECONDS,
+        }
+
+
+def clear_cache() -> None:
+    """Drop every entry and reset the counters."""
+    global _bytes
+    with _lock:
+        _entries.clear()
+        _versions.clear()
+        _bytes = 0
+        for k in _stats:
+            _stats[k] = 0
@@ -0,0 +1,154 @@
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import data_store
+from data_store import dataset_artifact, dataset_view, ingest_games, load_table
+from result_cache import memoized
+
+pytest.importorskip("pyarrow")
+
+
+def _rows(game: int, n: int, metric: float = 1.0) -> pd.DataFrame:
+    return pd.DataFrame({
+        "SeasonKey": 2025,
+        "GameKey": game,
+        "DriveKey": [game * 100 + i for i in range(n)],
+        "chance_id": [f"c-{game}-{i}" for i in range(n)],
+        "DTeamAbbrev": "OKC",
+        "metric": metric,
+    })
+
+
+def _write_csv(path: Path, df: pd.DataFrame) -> None:
+    df.to_csv(path, index=False)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))  # a new mtime even within the same tick
+
+
+def test_ingested_games_survive_compaction_and_reseed(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_store, "COMPACT_AFTER", 2)
+    csv_path = tmp_path / "scr_defended_test.csv"
+    _write_csv(csv_path, pd.concat([_rows(1, 3), _rows(2, 4)]))
+    load_table(csv_path)
+
+    # a new game plus a correction to game 1: two deltas -> compacted into base
+    ingest_games(csv_path, _rows(3, 9))
+    ingest_games(csv_path, _rows(1, 3, metric=5.0))
+
+    # the season CSV changes elsewhere (game 2) -> re-seed
+    _write_csv(csv_path, pd.concat([_rows(1, 3), _rows(2, 5)]))
+    df = load_table(csv_path)
+
+    counts = df.groupby("GameKey").size().to_dict()
+    assert counts == {1: 3, 2: 5, 3: 9}
+    assert (df.loc[df["GameKey"] == 1, "metric"] == 5.0).all()
+
+
+def test_reseed_after_ingesting_a_new_column(tmp_path):
+    csv_path = tmp_path / "scr_defended_test.csv"
+    _write_csv(csv_path, pd.concat([_rows(1, 3), _rows(2, 4)]))
+    load_table(csv_path)
+    ingest_games(csv_path, _rows(3, 2).assign(extra=7.0))
+
+    _write_csv(csv_path, pd.concat([_rows(1, 3), _rows(2, 5)]))
+    df = load_table(csv_path)
+
+    assert df.groupby("GameKey").size().to_dict() == {1: 3, 2: 5, 3: 2}
+    assert df.loc[df["GameKey"] == 3, "extra"].eq(7.0).all()
+    assert df.loc[df["GameKey"] != 3, "extra"].isna().all()
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_seed_widens_columns_the_sample_got_wrong(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_store, "CSV_SAMPLE_ROWS", 10)
+    monkeypatch.setattr(data_store, "CSV_CHUNK_ROWS", 10)
+    df = _rows(1, 30)
+    df["late_text"] = [None] * 25 + ["text"] * 5  # blank through the sample, text after
+    df["late_frac"] = [float(i) for i in range(29)] + [2.5]  # whole numbers, then a fraction
+    csv_path = tmp_path / "scr_defended_test.csv"
+    _write_csv(csv_path, df)
+
+    out = load_table(csv_path)
+    assert out["late_text"].tolist()[-5:] == ["text"] * 5
+    assert out["late_text"].isna().sum() == 25
+    assert out["late_frac"].iloc[-1] == 2.5
+    assert out["late_frac"].iloc[3] == 3.0
+
+    typed = data_store.read_csv_typed(csv_path)
+    assert typed["late_text"].iloc[-1] == "text" and typed["late_frac"].iloc[-1] == 2.5
+
+
+def test_artifact_build_can_wait_on_a_memoized_reader(tmp_path):
+    # a build() calling a memoized query whose computation reads the registry
+    csv_path = tmp_path / "scr_defended_test.csv"
+    _write_csv(csv_path, _rows(1, 3))
+    started = threading.Event()
+
+    @memoized(lambda: [str(csv_path)])
+    def game_count():
+        started.set()
+        time.sleep(0.3)
+        return int(dataset_view(csv_path, ["GameKey"])["GameKey"].nunique())
+
+    def artifact():
+        started.wait()
+        dataset_artifact(csv_path, ("test_games",), game_count)
+
+    threads = [threading.Thread(target=fn, daemon=True) for fn in (game_count, artifact)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    assert not any(t.is_alive() for t in threads)
+
+
+def test_ingest_converts_every_game_before_writing(tmp_path):
+    csv_path = tmp_path / "scr_defended_test.csv"
+    _write_csv(csv_path, _rows(1, 3))
+    load_table(csv_path)
+    ingest_games(csv_path, _rows(2, 2).assign(drive_label="good", points_scored=1))
+    before = data_store.store_games(csv_path)
+
+    # game 2 again plus game 3, whose fractional points don't fit the stored int64
+    again = pd.concat([_rows(2, 2).assign(drive_label="bad", points_scored=2), _rows(3, 2).assign(points_scored=1.5)])
+    ingest_games(csv_path, again)
+    after = data_store.store_games(csv_path)
+    df = load_table(csv_path)
+
+    assert after["2025/2"] != before["2025/2"] and "2025/3" in after
+    assert (df.loc[df["GameKey"] == 2, "drive_label"] == "bad").all()
+    points = df.set_index("DriveKey")["points_scored"]
+    assert points.loc[[200, 201, 300, 301]].tolist() == [2.0, 2.0, 1.5, 1.5]
+
+
+def test_slow_load_does_not_block_other_datasets(tmp_path, monkeypatch):
+    slow_path, warm_path = tmp_path / "closeouts_defended_test.csv", tmp_path / "scr_defended_test.csv"
+    _write_csv(slow_path, _rows(1, 3))
+    _write_csv(warm_path, _rows(2, 3))
+    dataset_view(warm_path, ["GameKey"])
+
+    load_mapped, started = data_store.load_mapped, threading.Event()
+
+    def slow_load(csv_path, columns=None):
+        if Path(csv_path).name == slow_path.name:
+            started.set()
+            time.sleep(2)
+        return load_mapped(csv_path, columns)
+
+    monkeypatch.setattr(data_store, "load_mapped", slow_load)
+    loader = threading.Thread(target=dataset_view, args=(slow_path, ["GameKey"]), daemon=True)
+    loader.start()
+    started.wait(5)
+
+    t0 = time.perf_counter()
+    assert len(dataset_view(warm_path, ["GameKey"])) == 3
+    assert time.perf_counter() - t0 < 1
+    loader.join(10)
@@ -1,10 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
 import streamlit as st
-import pandas as pd
+
+from queries import (
+    ALL,
+    ALL_GAMES,
+    ALL_TEAMS,
+    PAGE_SIZE,
+    PLAY_PAGES,
+    chance_ids,
+    chance_ids_page,
+    chance_index,
+    chance_options,
+    dataset_spec,
+    defender_summary,
+    export_rows,
+    facet_options,
+    page_frame,
+    team_games_index,
+)
+from export import csv_text
 # import streamlit as st
 # import pandas as pd
 #
-ALL_TEAMS = "All Teams"
-ALL_GAMES = "All Games"
 
 # Persisted values (read these everywhere)
 K_TEAM = "GLOBAL_TEAM"
@@ -15,6 +34,19 @@ K_GAME_LABEL = "GLOBAL_GAME_LABEL"
 W_TEAM = "W_GLOBAL_TEAM"
 W_GAME_LABEL = "W_GLOBAL_GAME_LABEL"
 
+# url of pages/5_Chance_Lookup.py (?chance_id=... fills its search box)
+LOOKUP_PAGE = "Chance_Lookup"
+
+# warms the result cache for sections further down the page while the ones
+# above compute; the section's own call then hits (or waits on) the same entry
+_PREFETCH = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+
+
+def _prefetch(fn, *args, **kwargs) -> None:
+    # errors surface in the section's own call, not here
+    _PREFETCH.submit(fn, *args, **kwargs)
+
+
 def get_global_selection():
     return (
         st.session_state.get(K_TEAM, ALL_TEAMS),
@@ -23,27 +55,6 @@ def get_global_selection():
     )
 
 
-def _make_game_label(df: pd.DataFrame, game_date_col: str, oteam_col: str) -> pd.Series:
-    # Normalize to reduce mismatch
-    date = pd.to_datetime(df[game_date_col], errors="coerce").dt.strftime("%Y-%m-%d")
-    date = date.fillna(df[game_date_col].astype(str)).astype(str).str.strip()
-    opp = df[oteam_col].astype(str).str.strip().str.upper()
-    return date + " vs " + opp
-
-@st.cache_data
-def _load_master(master_csv_path: str, defteam_col: str, game_id_col: str, game_date_col: str, oteam_col: str) -> pd.DataFrame:
-    df = pd.read_csv(master_csv_path)
-
-    df["_Team"] = df[defteam_col].astype(str).str.strip() if defteam_col in df.columns else "UNKNOWN"
-    df["_GameId"] = df[game_id_col].astype(str).str.strip() if game_id_col in df.columns else "UNKNOWN"
-
-    if game_date_col in df.columns and oteam_col in df.columns:
-        df["_GameLabel"] = _make_game_label(df, game_date_col, oteam_col)
-    else:
-        df["_GameLabel"] = df["_GameId"]
-
-    return df[["_Team", "_GameId", "_GameLabel"]].drop_duplicates()
-
 def ensure_global_team_game_sidebar(
     *,
     master_csv_path: str,
@@ -63,7 +74,6 @@ def ensure_global_team_game_sidebar(
       W_GLOBAL_TEAM, W_GLOBAL_GAME_ID
     """
     import streamlit as st
-    import pandas as pd
 
     ALL_TEAMS = "All Teams"
     ALL_GAMES = "All Games"
@@ -75,30 +85,11 @@ def ensure_global_team_game_sidebar(
     W_TEAM = "W_GLOBAL_TEAM"
     W_GAME_ID = "W_GLOBAL_GAME_ID"
 
-    def _make_label(df: pd.DataFrame) -> pd.Series:
-        date = pd.to_datetime(df[game_date_col], errors="coerce").dt.strftime("%Y-%m-%d")
-        date = date.fillna(df[game_date_col].astype(str)).astype(str).str.strip()
-        opp = df[oteam_col].astype(str).str.strip().str.upper()
-        return date + " vs " + opp
-
-    @st.cache_data
-    def _load_master(path: str) -> pd.DataFrame:
-        df = pd.read_csv(path)
-
-        df["_Team"] = df[defteam_col].astype(str).str.strip() if defteam_col in df.columns else "UNKNOWN"
-        df["_GameId"] = df[game_id_col].astype(str).str.strip() if game_id_col in df.columns else "UNKNOWN"
-
-        if game_date_col in df.columns and oteam_col in df.columns:
-            df["_GameLabel"] = _make_label(df)
-        else:
-            df["_GameLabel"] = df["_GameId"]
-
-        return df[["_Team", "_GameId", "_GameLabel"]].drop_duplicates()
-
-    master = _load_master(master_csv_path)
-
-    teams = sorted(master["_Team"].dropna().unique().tolist())
-    team_options = [ALL_TEAMS] + teams
+    # precomputed per data version (queries.team_games_index): no pandas on a rerun;
+    # labels / order come from the game dimension (game_date_col / oteam_col are the dimension's too)
+    with st.sidebar, st.spinner("Loading games..."):
+        index = team_games_index(master_csv_path, defteam_col, game_id_col)
+    team_options = index["teams"]
 
     # ---- initialize persisted keys as STRINGS ----
     if K_TEAM not in st.session_state:
@@ -121,30 +112,16 @@ def ensure_global_team_game_sidebar(
     st.session_state[W_TEAM] = str(st.session_state[W_TEAM])
     st.session_state[W_GAME_ID] = str(st.session_state[W_GAME_ID])
 
-    def _games_for_team(team_val: str) -> pd.DataFrame:
-        if team_val == ALL_TEAMS:
-            sub = master[["_GameId", "_GameLabel"]].drop_duplicates()
-            # newest first by label
-            sub = sub.sort_values("_GameLabel", ascending=False)
-            # optionally include All Games at top
-            top = pd.DataFrame({"_GameId": [ALL_GAMES], "_GameLabel": [ALL_GAMES]})
-            return pd.concat([top, sub], ignore_index=True)
-        sub = master.loc[master["_Team"] == team_val, ["_GameId", "_GameLabel"]].drop_duplicates()
-        return sub.sort_values("_GameLabel", ascending=False)
-
     with st.sidebar:
         st.selectbox("Team", team_options, key=W_TEAM)
 
-        gdf = _games_for_team(str(st.session_state[W_TEAM])).reset_index(drop=True)
-
-        # ensure ids are strings
-        gdf["_GameId"] = gdf["_GameId"].astype(str)
-        game_ids = gdf["_GameId"].tolist()
-        label_by_id = dict(zip(gdf["_GameId"], gdf["_GameLabel"].astype(str)))
+        team_val = str(st.session_state[W_TEAM])
+        game_ids = index["games"].get(team_val, [])
+        label_by_id = index["labels"].get(team_val, {})
 
         # coerce invalid selection (string-safe)
         cur_id = str(st.session_state[W_GAME_ID])
-        if cur_id not in game_ids:
+        if cur_id not in label_by_id:
             st.session_state[W_GAME_ID] = (ALL_GAMES if ALL_GAMES in game_ids else (game_ids[0] if game_ids else ALL_GAMES))
 
         st.selectbox(
@@ -166,24 +143,66 @@ def ensure_global_team_game_sidebar(
     return chosen_team, chosen_game_id, st.session_state[K_GAME_LABEL]
 
 
+def paged_table(fetch, *, key: str, scope=None, export=None, export_name: str = "export.csv", links: dict | None = None):
+    """
+    Server-side paginated table: only the current page is sent to the browser.
+
+    fetch(sort_by, descending, page, page_size) -> (page frame, total rows, *extra)
+    is called with the widget state under `key` (sort column / direction /
+    page; back to page 1 when they or `scope` change). `export`, if given,
+    returns the frames of a CSV download, built chunk by chunk only when clicked.
+    `links` ({column: page url}) shows those columns as links to
+    <page url>?<column>=<value>. Returns fetch's result.
+    """
+    k_sort, k_desc, k_page, k_scope = (f"{key}_{s}" for s in ("sort", "desc", "page", "scope"))
+    if st.session_state.get(k_scope) != scope:
+        st.session_state[k_scope] = scope
+        st.session_state[k_page] = 1
+    to_first = lambda: st.session_state.update({k_page: 1})
+
+    page = int(st.session_state.get(k_page, 1))
+    sort_by, descending = st.session_state.get(k_sort), bool(st.session_state.get(k_desc, False))
+    result = fetch(sort_by, descending, page - 1, PAGE_SIZE)
+    rows, n = result[0], result[1]
+    n_pages = max(1, -(-n // PAGE_SIZE))
+    if page > n_pages:
+        page = st.session_state[k_page] = n_pages
+        result = fetch(sort_by, descending, page - 1, PAGE_SIZE)
+        rows = result[0]
+
+    shown, config = rows, {}
+    for col, url in (links or {}).items():
+        if col in rows.columns:
+            shown = shown.assign(**{col: f"{url}?{col}=" + rows[col].astype(str).map(quote)})
+            config[col] = st.column_config.LinkColumn(col, display_text=f"{col}=(.*)$")
+    st.dataframe(shown, use_container_width=True, hide_index=True, column_config=config)
+
+    c1, c2, c3, c4 = st.columns([2, 1, 1, 1])
+    with c1:
+        st.selectbox("Sort by", list(rows.columns), index=None, placeholder="(file order)", key=k_sort, on_change=to_first)
+    with c2:
+        st.toggle("Descending", key=k_desc, on_change=to_first)
+    with c3:
+        st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, step=1, key=k_page)
+    with c4:
+        if export is not None:
+            st.download_button(
+                "Export CSV",
+                data=lambda: "".join(csv_text(export())),
+                file_name=export_name,
+                mime="text/csv",
+                on_click="ignore",
+                disabled=n == 0,
+            )
+    first = (page - 1) * PAGE_SIZE
+    st.caption(f"Showing rows {min(first + 1, n):,}-{min(first + PAGE_SIZE, n):,} of **{n:,}**")
+    return result
 
-def apply_team_game_filter_to_df(
-    df: pd.DataFrame,
-    *,
-    team_value: str,
-    game_id_value: str,
-    defteam_col: str,
-    game_id_col: str,
-):
-    df = df.copy()
-
-    if team_value != ALL_TEAMS and defteam_col in df.columns:
-        df = df[df[defteam_col].astype(str).str.strip() == str(team_value)]
-
-    if game_id_value != ALL_GAMES and game_id_col in df.columns:
-        df = df[df[game_id_col].astype(str).str.strip() == str(game_id_value)]
 
-    return df
+def page_kwargs(play: str) -> dict:
+    # build_app kwargs for one of queries.PLAY_PAGES (pages add their own state_prefix)
+    page = PLAY_PAGES[play]
+    return {"title": page["title"], "count_label": page["count_label"], **page["schema"]}
 
 
 def build_app(
@@ -198,6 +217,7 @@ def build_app(
     defender_name_cols: list[str],
     outcome_col: str,
     chance_col: str,
+    player_key_col: str = "PlayerKey",
     deftype_col: str | None = None,
     navtype_col: str | None = None,
     navtype_label: str = "Screen Nav Type",
@@ -209,68 +229,44 @@ def build_app(
     master_game_id_col: str = "GameKey",
     master_game_date_col: str = "game_date",
     master_oteam_col: str = "OTeamAbbrev",
+    lazy: bool = True,
 ):
+    """
+    One defended-play page. With `lazy` (the default) the chance_id section
+    is a fragment: its data is prefetched in the background while the sidebar
+    and summary compute, its selectboxes rerun only that section, and with
+    All Games selected it computes nothing.
+    """
     st.title(title)
 
-    @st.cache_data
-    def load_data(path: str) -> pd.DataFrame:
-        return pd.read_csv(path)
-
-    df = load_data(data_path)
-
-    # Build Defender display name
-    if len(defender_name_cols) == 2 and all(c in df.columns for c in defender_name_cols):
-        df["Defender"] = (
-            df[defender_name_cols[0]].astype(str).str.strip()
-            + " "
-            + df[defender_name_cols[1]].astype(str).str.strip()
-        )
-    else:
-        df["Defender"] = df[defender_name_cols[0]].astype(str).str.strip()
-
-    # (optional) build Game label for display/drilldown
-    if game_date_col in df.columns and oteam_col in df.columns:
-        df["Game"] = _make_game_label(df, game_date_col, oteam_col)
-    else:
-        df["Game"] = "UNKNOWN"
-
-    # Normalize key cols
-    for c in [defteam_col, game_id_col, outcome_col, chance_col]:
-        if c in df.columns:
-            df[c] = df[c].astype(str).str.strip()
+    # all data work happens in queries (memoized, shared across sessions); this only renders
+    ds = dataset_spec(
+        data_path=data_path,
+        defteam_col=defteam_col,
+        game_id_col=game_id_col,
+        game_date_col=game_date_col,
+        oteam_col=oteam_col,
+        defender_name_cols=defender_name_cols,
+        outcome_col=outcome_col,
+        chance_col=chance_col,
+        player_key_col=player_key_col,
+        deftype_col=deftype_col,
+        navtype_col=navtype_col,
+    )
 
     # Global sidebar (stable)
     # Read global selection (sidebar must be rendered in the page file)
     team, game_id, game_label = get_global_selection()
 
-    # Apply stable filtering to this df (by GameKey + team)
-    df = apply_team_game_filter_to_df(
-        df,
-        team_value=team,
-        game_id_value=game_id,
-        defteam_col=defteam_col,
-        game_id_col=game_id_col,
-    )
+    k_ids = {c: f"{state_prefix}_ids_{c}" for c in ("player", "outcome", "deftype")}
+    if lazy and game_id != ALL_GAMES:
+        _prefetch(chance_options, ds, team, game_id)
+        _prefetch(chance_ids, ds, team, game_id, *(str(st.session_state.get(k, ALL)) for k in k_ids.values()))
+        _prefetch(chance_index)  # so the chance_id links open on a built index
 
     # ---------- the rest of your existing build_app logic ----------
     # IMPORTANT: remove the Team/Game multiselects entirely (keep Defender, DefType, NavType, etc.)
 
-    navtype_col_effective = navtype_col if (navtype_col and navtype_col in df.columns) else None
-
-    def apply_filters(d: pd.DataFrame, filters: dict) -> pd.DataFrame:
-        out = d
-        for col, selected in filters.items():
-            if selected:
-                out = out[out[col].isin(selected)]
-        return out
-
-    def available_options(d: pd.DataFrame, col: str, filters: dict) -> list:
-        other_filters = {k: v for k, v in filters.items() if k != col}
-        sub = apply_filters(d, other_filters)
-        return (
-            sub[col].dropna().astype(str).str.strip().drop_duplicates().sort_values().tolist()
-        )
-
     # global defender filter (shared)
     k_def = "global_sel_defender"
     if k_def not in st.session_state:
@@ -286,153 +282,92 @@ def build_app(
 
     st.sidebar.header("Filters (page)")
 
+    # only the type columns this dataset has come back as facets
+    with st.spinner("Loading data..."):
+        options = facet_options(ds, team, game_id, st.session_state[k_def])
+
     # Def Type (page)
-    if deftype_col and deftype_col in df.columns:
-        opts = available_options(df, deftype_col, {"Defender": st.session_state[k_def]})
-        st.sidebar.multiselect("Def Type", options=opts, key=k_type)
+    if deftype_col in options:
+        st.sidebar.multiselect("Def Type", options=options[deftype_col], key=k_type)
 
     # Nav Type (page)
-    if navtype_col_effective:
-        opts = available_options(df, navtype_col_effective, {"Defender": st.session_state[k_def]})
-        st.sidebar.multiselect(navtype_label, options=opts, key=k_nav)
+    if navtype_col in options:
+        st.sidebar.multiselect(navtype_label, options=options[navtype_col], key=k_nav)
 
     # Defender (global)
-    defender_opts = available_options(df, "Defender", {})
-    st.sidebar.multiselect("Defender", options=defender_opts, key=k_def)
-
-    filters = {"Defender": st.session_state[k_def]}
-    if deftype_col and deftype_col in df.columns:
-        filters[deftype_col] = st.session_state[k_type]
-    if navtype_col_effective:
-        filters[navtype_col_effective] = st.session_state[k_nav]
-    f = apply_filters(df, filters)
-
-
+    st.sidebar.multiselect("Defender", options=options["Defender"], key=k_def)
+
+    with st.spinner("Computing summary..."):
+        summary, n_rows = defender_summary(
+            ds, team, game_id,
+            defenders=st.session_state[k_def],
+            deftypes=st.session_state[k_type],
+            navtypes=st.session_state[k_nav],
+            count_label=count_label,
+        )
 
     st.caption(f"Global selection: Team={team}, Game={game_label}")
-    st.caption(f"Rows after filters: **{len(f):,}**")
+    st.caption(f"Rows after filters: **{n_rows:,}**")
 
 
     # Summary (kept minimal; keep your existing summary formatting if you want)
     st.subheader("Defender Summary")
-    grp = f.groupby(["Defender", outcome_col], dropna=False).size().reset_index(name="count")
-    piv = grp.pivot(index="Defender", columns=outcome_col, values="count").fillna(0).astype(int)
-    piv.insert(0, count_label, piv.sum(axis=1))
-    st.dataframe(piv.reset_index(), use_container_width=True, hide_index=True)
+    st.dataframe(summary, use_container_width=True, hide_index=True)
 
     # -----------------------------
     # chance_id table (selected game) + filters (player, outcome, def type)
     # -----------------------------
     if game_id == ALL_GAMES:
         st.info("Select a specific Game (not All Games) to show chance_ids.")
-    elif chance_col not in df.columns:
-        st.warning(f"'{chance_col}' not found in this CSV.")
-    else:
-        st.subheader("chance_id list (selected game)")
+        return
 
-        # Use df (team+game filtered) as base so the list doesn't disappear due to other page filters.
-        # If you want it to respect all page filters, change df -> f below.
-        base = df.copy()
-
-        player_col = "Defender" if "Defender" in base.columns else None
-        if player_col is None:
-            st.warning("No player column found (expected 'Defender').")
-            player_options = ["(All)"]
-        else:
-            player_options = ["(All)"] + sorted(
-                base[player_col].dropna().astype(str).str.strip().unique().tolist()
-            )
+    def chance_section():
+        if chance_col not in page_frame(ds).columns:
+            st.warning(f"'{chance_col}' not found in this CSV.")
+            return
 
-        # Outcome options
-        if outcome_col in base.columns:
-            outcomes_raw = (
-                base[outcome_col].dropna().astype(str).str.strip().unique().tolist()
-            )
-            lowers = {x.lower() for x in outcomes_raw}
-            if {"good", "neutral", "bad"}.issubset(lowers):
-                outcome_options = ["(All)", "good", "neutral", "bad"]
-            else:
-                outcome_options = ["(All)"] + sorted(outcomes_raw)
-        else:
-            outcome_options = ["(All)"]
-
-        # Def Type options (only if this page has deftype_col)
-        deftype_present = bool(deftype_col) and (deftype_col in base.columns)
-        if deftype_present:
-            deftypes = sorted(base[deftype_col].dropna().astype(str).str.strip().unique().tolist())
-            deftype_options = ["(All)"] + deftypes
-        else:
-            deftype_options = ["(All)"]
+        st.subheader("chance_id list (selected game)")
+
+        # Built from the team+game selection, so the list doesn't disappear due to other page filters.
+        with st.spinner("Loading chance_ids..."):
+            choices = chance_options(ds, team, game_id)
+        deftype_present = bool(deftype_col) and deftype_col in page_frame(ds).columns
 
         c1, c2, c3 = st.columns([1, 1, 1])
         with c1:
             sel_player = st.selectbox(
                 "Player",
-                options=player_options,
-                key=f"{state_prefix}_ids_player",
+                options=choices["player"],
+                key=k_ids["player"],
             )
         with c2:
             sel_outcome = st.selectbox(
                 "Outcome",
-                options=outcome_options,
-                key=f"{state_prefix}_ids_outcome",
+                options=choices["outcome"],
+                key=k_ids["outcome"],
             )
         with c3:
             sel_deftype = st.selectbox(
                 "Def Type",
-                options=deftype_options,
-                key=f"{state_prefix}_ids_deftype",
+                options=choices["deftype"],
+                key=k_ids["deftype"],
                 disabled=not deftype_present,
             )
 
-        df_ids = base.copy()
-
-        # Apply Player filter
-        if sel_player != "(All)" and player_col and player_col in df_ids.columns:
-            df_ids = df_ids[df_ids[player_col].astype(str).str.strip() == sel_player]
-
-        # Apply Outcome filter
-        if sel_outcome != "(All)" and outcome_col in df_ids.columns:
-            if sel_outcome in ["good", "neutral", "bad"]:
-                df_ids = df_ids[
-                    df_ids[outcome_col].astype(str).str.strip().str.lower() == sel_outcome
-                    ]
-            else:
-                df_ids = df_ids[df_ids[outcome_col].astype(str).str.strip() == sel_outcome]
-
-        # Apply Def Type filter
-        if deftype_present and sel_deftype != "(All)":
-            df_ids = df_ids[df_ids[deftype_col].astype(str).str.strip() == sel_deftype]
-
-        # Build table
-        show_cols = []
-        rename_map = {}
-
-        if player_col and player_col in df_ids.columns:
-            show_cols.append(player_col)
-            rename_map[player_col] = "Player"
-
-        if outcome_col in df_ids.columns:
-            show_cols.append(outcome_col)
-            rename_map[outcome_col] = "Outcome"
-
-        if deftype_present:
-            show_cols.append(deftype_col)
-            rename_map[deftype_col] = "Def Type"
-
-        show_cols.append(chance_col)
-        rename_map[chance_col] = "chance_id"
-
-        table_df = df_ids[show_cols].copy().rename(columns=rename_map)
-
-        # Clean
-        for c in ["Player", "Outcome", "Def Type", "chance_id"]:
-            if c in table_df.columns:
-                table_df[c] = table_df[c].astype(str).str.strip()
-
-        table_df = table_df.dropna(subset=["chance_id"])
-        table_df = table_df[table_df["chance_id"].ne("")]
+        selection = (sel_player, sel_outcome, sel_deftype)
+        _, _, n_chances = paged_table(
+            lambda sort_by, descending, page, page_size: chance_ids_page(
+                ds, team, game_id, *selection,
+                sort_by=sort_by, descending=descending, page=page, page_size=page_size,
+            ),
+            key=f"{state_prefix}_ids_table",
+            scope=(team, game_id, *selection),
+            export=lambda: (
+                df for _, df in export_rows(ds, [dict(zip(("team", "game", "defender", "outcome", "deftype"), (team, game_id, *selection)))])
+            ),
+            export_name=f"{state_prefix}_chance_ids_{team}_{game_id}.csv",
+            links={"chance_id": LOOKUP_PAGE},
+        )
+        st.caption(f"Unique chance_ids: **{n_chances:,}**")
 
-    st.caption(f"Rows: **{len(table_df):,}**")
-    st.caption(f"Unique chance_ids: **{table_df['chance_id'].nunique():,}**")
-    st.dataframe(table_df, use_container_width=True, hide_index=True)
+    (st.fragment(chance_section) if lazy else chance_section)()